@@ -0,0 +1,134 @@
+from botocore.exceptions import ClientError
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+import gzip
+import json
+import os
+
+from models import Event, Registration
+
+
+class EventArchive:
+    """Cold storage for events moved out of the hot tables by archive_events.py.
+
+    ``ArchivedEvents`` is keyed by ``eventId``; ``ArchivedRegistrations`` by
+    ``eventId`` + ``userId`` whatever key schema the hot table uses, so all of
+    an event's registrations come back from one query; its
+    ``userId-eventDate-index`` serves a user's archived history. Items are
+    stored as they were in the hot tables.
+    """
+
+    def __init__(self, dynamodb, events_table_name: str, registrations_table_name: str):
+        self.dynamodb = dynamodb
+        self.events_table_name = events_table_name
+        self.events_table = dynamodb.Table(events_table_name)
+        self.registrations_table = dynamodb.Table(registrations_table_name)
+
+    def put_event(self, item: dict):
+        self.events_table.put_item(Item=item)
+
+    def put_registrations(self, items: Iterable[dict]):
+        with self.registrations_table.batch_writer(overwrite_by_pkeys=['eventId', 'userId']) as batch:
+            for item in items:
+                batch.put_item(Item=item)
+
+    def get_event(self, event_id: str) -> Optional[Event]:
+        try:
+            response = self.events_table.get_item(Key={'eventId': event_id})
+        except ClientError:
+            return None
+        if 'Item' in response:
+            return Event(**response['Item'])
+        return None
+
+    def batch_get_events(self, event_ids: List[str]) -> Dict[str, Event]:
+        events = {}
+        unique_ids = list(dict.fromkeys(event_ids))
+        # BatchGetItem accepts at most 100 keys per call
+        for start in range(0, len(unique_ids), 100):
+            request_items = {
+                self.events_table_name: {
+                    'Keys': [{'eventId': event_id} for event_id in unique_ids[start:start + 100]]
+                }
+            }
+            while request_items:
+                response = self.dynamodb.batch_get_item(RequestItems=request_items)
+                for item in response.get('Responses', {}).get(self.events_table_name, []):
+                    events[item['eventId']] = Event(**item)
+                request_items = response.get('UnprocessedKeys')
+        return events
+
+    def list_events(self) -> List[Event]:
+        try:
+            response = self.events_table.scan()
+            return [Event(**item) for item in response.get('Items', [])]
+        except ClientError:
+            return []
+
+    def get_event_registrations(self, event_id: str) -> List[Registration]:
+        kwargs = {
+            'KeyConditionExpression': 'eventId = :eid',
+            'ExpressionAttributeValues': {':eid': event_id}
+        }
+        registrations = []
+        try:
+            while True:
+                response = self.registrations_table.query(**kwargs)
+                registrations.extend(Registration(**item) for item in response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    return registrations
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        except ClientError:
+            return []
+
+    def query_user_registrations_by_date(self, user_id: str, from_date: Optional[str] = None) -> List[Registration]:
+        """All of a user's archived registrations, ordered by event date."""
+        key_condition = 'userId = :uid'
+        values = {':uid': user_id}
+        if from_date:
+            key_condition += ' AND eventDate >= :from'
+            values[':from'] = from_date
+        kwargs = {
+            'IndexName': 'userId-eventDate-index',
+            'KeyConditionExpression': key_condition,
+            'ExpressionAttributeValues': values
+        }
+        registrations = []
+        while True:
+            response = self.registrations_table.query(**kwargs)
+            registrations.extend(Registration(**item) for item in response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return registrations
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class ArchiveFileWriter:
+    """Writes archived events as gzip-compressed JSON lines.
+
+    Each line is ``{"event": {...}, "registrations": [...]}``. An event can
+    appear on a second line holding registrations made while it was being
+    archived. Files are for offline retention; the API cannot read them back.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+
+    def put_event(self, event_item: dict, registration_items: List[dict]):
+        record = {'event': event_item, 'registrations': registration_items}
+        self._file.write(json.dumps(record, default=_json_default) + '\n')
+        # Flush each record so a crash never deletes hot items whose copy is still buffered
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Move finished events and their registrations out of the hot tables.
+
+An event is archived when its status is ``completed`` or ``cancelled``, or
+its date is before the cutoff (today by default). Each event is copied with
+its registrations to the archive tables, or to gzip-compressed JSON lines
+files with ``--output-dir``. Its registrations, waitlist counters and the event
+itself are then deleted from the hot tables. Events are found with a parallel
+scan and every segment archives its share concurrently; deletes are batched.
+
+    python archive_events.py --dry-run
+    python archive_events.py --before 2026-01-01
+    python archive_events.py --output-dir /var/backups/events --segments 16
+
+Archiving is idempotent: an event interrupted half way is still in the hot
+table, and the next run copies and deletes it again. Reads fall back to the
+archive tables with ``includeArchived=true``; archive files are not readable
+by the API.
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+from archive import ArchiveFileWriter
+from database import DynamoDBClient
+from models import Event
+
+ARCHIVED_STATUSES = ('completed', 'cancelled')
+
+
+def _scan_segment(table, segment: int, total_segments: int, **scan_kwargs):
+    kwargs = {'Segment': segment, 'TotalSegments': total_segments, **scan_kwargs}
+    while True:
+        response = table.scan(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def archivable_filter(before: str) -> dict:
+    return {
+        'FilterExpression': '#status IN (:completed, :cancelled) OR #date < :before',
+        'ExpressionAttributeNames': {'#status': 'status', '#date': 'date'},
+        'ExpressionAttributeValues': {
+            ':completed': ARCHIVED_STATUSES[0],
+            ':cancelled': ARCHIVED_STATUSES[1],
+            ':before': before
+        }
+    }
+
+
+def archive_event(db: DynamoDBClient, item: dict, writer: Optional[ArchiveFileWriter]) -> int:
+    """Archive one event; returns the number of registrations moved."""
+    event = Event(**item)
+    moved = 0
+    written = False
+    # The second pass picks up registrations created while the event was being
+    # deleted; after that the register endpoint no longer finds the event
+    for _ in range(2):
+        registrations = db.get_event_registrations(event.eventId)
+        registration_items = [r.model_dump(exclude_none=True) for r in registrations]
+        if writer is not None:
+            if registration_items or not written:
+                writer.put_event(item, registration_items)
+        else:
+            db.archive.put_event(item)
+            db.archive.put_registrations(registration_items)
+        written = True
+        db.delete_registrations(registrations)
+        moved += len(registrations)
+        if db.get_event(event.eventId) is not None:
+            db.delete_event(event.eventId)
+        elif not registrations:
+            break
+    db.waitlist.delete_event(event.eventId)
+    return moved
+
+
+def _archive_segment(db: DynamoDBClient, segment: int, total_segments: int, before: str,
+                     output_dir: Optional[str], run_id: str, dry_run: bool) -> dict:
+    stats = {'events': 0} if dry_run else {'events': 0, 'registrations': 0}
+    writer = None
+    if output_dir and not dry_run:
+        writer = ArchiveFileWriter(os.path.join(output_dir, f'events-{run_id}-{segment:03d}.jsonl.gz'))
+    try:
+        for item in _scan_segment(db.events_table, segment, total_segments, **archivable_filter(before)):
+            stats['events'] += 1
+            if dry_run:
+                continue
+            stats['registrations'] += archive_event(db, item, writer)
+    finally:
+        if writer is not None:
+            writer.close()
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Archive completed, cancelled and past events")
+    parser.add_argument('--before', default=datetime.now(timezone.utc).date().isoformat(),
+                        help="Archive events dated before this ISO date (default: today)")
+    parser.add_argument('--output-dir', help="Write gzip JSON lines files here instead of the archive tables")
+    parser.add_argument('--segments', type=int, default=8, help="Parallel scan segments")
+    parser.add_argument('--dry-run', action='store_true', help="Only count the events that would be archived")
+    args = parser.parse_args(argv)
+
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')
+    # boto3 resources are not thread safe, so every segment gets its own client
+    clients = [DynamoDBClient() for _ in range(args.segments)]
+    totals = {}
+    with ThreadPoolExecutor(max_workers=args.segments) as executor:
+        futures = [
+            executor.submit(_archive_segment, clients[segment], segment, args.segments, args.before,
+                            args.output_dir, run_id, args.dry_run)
+            for segment in range(args.segments)
+        ]
+        for future in futures:
+            for key, value in future.result().items():
+                totals[key] = totals.get(key, 0) + value
+
+    label = 'would archive' if args.dry_run else 'archived'
+    print(f"{label}: " + ", ".join(f"{k}={v}" for k, v in sorted(totals.items())))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,19 +1,56 @@
 import boto3
-from botocore.exceptions import ClientError
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 import os
 import uuid
-from typing import List, Optional
+import logging
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+from archive import EventArchive
 from models import (
     Event, EventCreate, EventUpdate,
     User, UserCreate,
     Registration, RegistrationCreate, RegistrationResponse
 )
+from profiling import instrument_client
+from singleflight import SingleFlight
+from stats import StatsStore
+from waitlist import WaitlistCounters
+
+logger = logging.getLogger(__name__)
+
+# Registrations key schemas:
+#   legacy    - partition key registrationId, lookups go through userId-eventId-index
+#   composite - partition key eventId, sort key userId, lookups are direct get_item calls
+LEGACY_KEY_SCHEMA = 'legacy'
+COMPOSITE_KEY_SCHEMA = 'composite'
+
+TRANSACTION_MAX_ITEMS = 100
+PROMOTION_CONCURRENCY = int(os.getenv('PROMOTION_CONCURRENCY', '4'))
+FANOUT_CONCURRENCY = int(os.getenv('FANOUT_CONCURRENCY', '16'))
+
+
+class DuplicateRegistrationError(Exception):
+    """Raised when a user already holds a registration for an event."""
+
+
+def registration_key(registration: Registration, key_schema: str) -> dict:
+    if key_schema == COMPOSITE_KEY_SCHEMA:
+        return {'eventId': registration.eventId, 'userId': registration.userId}
+    return {'registrationId': registration.registrationId}
 
 
 class DynamoDBClient:
     def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb')
+        self.dynamodb = boto3.resource(
+            'dynamodb',
+            config=Config(max_pool_connections=int(os.getenv('DYNAMODB_MAX_POOL_CONNECTIONS', '10')))
+        )
+        instrument_client(self.dynamodb.meta.client)
+        # Concurrent reads of the same event or user share one GetItem
+        self.read_flights = SingleFlight()
         self.events_table_name = os.getenv('DYNAMODB_TABLE_NAME', 'Events')
         self.users_table_name = os.getenv('USERS_TABLE_NAME', 'Users')
         self.registrations_table_name = os.getenv('REGISTRATIONS_TABLE_NAME', 'Registrations')
@@ -21,6 +58,67 @@ class DynamoDBClient:
         self.events_table = self.dynamodb.Table(self.events_table_name)
         self.users_table = self.dynamodb.Table(self.users_table_name)
         self.registrations_table = self.dynamodb.Table(self.registrations_table_name)
+        self.stats = StatsStore(self.dynamodb, os.getenv('STATS_TABLE_NAME', 'Stats'))
+        self.waitlist = WaitlistCounters(self.dynamodb, os.getenv('WAITLISTS_TABLE_NAME', 'Waitlists'))
+        self.archive = EventArchive(
+            self.dynamodb,
+            os.getenv('ARCHIVED_EVENTS_TABLE_NAME', 'ArchivedEvents'),
+            os.getenv('ARCHIVED_REGISTRATIONS_TABLE_NAME', 'ArchivedRegistrations')
+        )
+
+        # Refreshing the event date and title copied onto registrations can mean
+        # 100k writes, so it never runs on the request path. "stream" leaves it to
+        # the Events table stream handler (streams.py); "background" runs it on a
+        # thread of this process, for servers and local development.
+        self.event_fields_fanout = os.getenv('EVENT_FIELDS_FANOUT', 'background')
+        if self.event_fields_fanout not in ('stream', 'background'):
+            raise ValueError(f"Unknown EVENT_FIELDS_FANOUT: {self.event_fields_fanout}")
+        self._fanout_executor = None
+
+        # Every registration changes the stats counters. "stream" leaves them to the
+        # Events table stream handler, which derives them from the event's old and
+        # new images; "request" updates them inline, where there is no stream.
+        self.stats_updates = os.getenv('STATS_UPDATES', 'request')
+        if self.stats_updates not in ('stream', 'request'):
+            raise ValueError(f"Unknown STATS_UPDATES: {self.stats_updates}")
+
+        self.registrations_key_schema = os.getenv('REGISTRATIONS_KEY_SCHEMA', LEGACY_KEY_SCHEMA)
+        if self.registrations_key_schema not in (LEGACY_KEY_SCHEMA, COMPOSITE_KEY_SCHEMA):
+            raise ValueError(f"Unknown REGISTRATIONS_KEY_SCHEMA: {self.registrations_key_schema}")
+
+        # During a key schema migration every registration write is mirrored to the
+        # table using the other key schema (see migrate_registrations.py)
+        self.registrations_mirror_table_name = os.getenv('REGISTRATIONS_MIRROR_TABLE_NAME')
+        self.registrations_mirror_table = None
+        self.registrations_mirror_key_schema = None
+        if self.registrations_mirror_table_name:
+            self.registrations_mirror_table = self.dynamodb.Table(self.registrations_mirror_table_name)
+            self.registrations_mirror_key_schema = (
+                LEGACY_KEY_SCHEMA if self.registrations_key_schema == COMPOSITE_KEY_SCHEMA
+                else COMPOSITE_KEY_SCHEMA
+            )
+
+    @property
+    def uses_composite_registrations(self) -> bool:
+        return self.registrations_key_schema == COMPOSITE_KEY_SCHEMA
+
+    def warm_up(self, connections: int = 1):
+        """Open up to `connections` pooled HTTPS connections to DynamoDB.
+
+        Issues concurrent reads of a key that never exists, so the TLS handshakes
+        happen here rather than on the first real requests.
+        """
+        if connections <= 0:
+            return
+
+        def probe(_):
+            try:
+                self.events_table.get_item(Key={'eventId': '__warmup__'})
+            except (BotoCoreError, ClientError) as e:
+                logger.warning("DynamoDB warm-up request failed: %s", e)
+
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            list(executor.map(probe, range(connections)))
 
     def create_event(self, event: EventCreate) -> Event:
         event_id = event.eventId if event.eventId else str(uuid.uuid4())
@@ -33,9 +131,18 @@ class DynamoDBClient:
         }
         
         self.events_table.put_item(Item=item)
-        return Event(**item)
+        created = Event(**item)
+        if self.stats_updates == 'request':
+            self.stats.apply_event_change(None, created)
+        return created
 
     def get_event(self, event_id: str) -> Optional[Event]:
+        return self.read_flights.do(('event', event_id), lambda: self._fetch_event(event_id))
+
+    async def get_event_async(self, event_id: str) -> Optional[Event]:
+        return await self.read_flights.do_async(('event', event_id), lambda: self._fetch_event(event_id))
+
+    def _fetch_event(self, event_id: str) -> Optional[Event]:
         try:
             response = self.events_table.get_item(Key={'eventId': event_id})
             if 'Item' in response:
@@ -67,18 +174,31 @@ class DynamoDBClient:
                 UpdateExpression=update_expression,
                 ExpressionAttributeNames=expression_attribute_names,
                 ExpressionAttributeValues=expression_attribute_values,
-                ReturnValues="ALL_NEW"
+                ReturnValues="ALL_OLD"
             )
-            return Event(**response['Attributes'])
         except ClientError:
             return None
 
+        if 'Attributes' not in response:
+            return None
+        previous = Event(**response['Attributes'])
+        event = previous.model_copy(update=update_data)
+        if self.stats_updates == 'request':
+            self.stats.apply_event_change(previous, event)
+        if ('date' in update_data or 'title' in update_data) and self.event_fields_fanout == 'background':
+            if self._fanout_executor is None:
+                self._fanout_executor = ThreadPoolExecutor(max_workers=1)
+            self._fanout_executor.submit(self._refresh_registration_event_fields, event)
+        return event
+
     def delete_event(self, event_id: str) -> bool:
         try:
-            self.events_table.delete_item(Key={'eventId': event_id})
-            return True
+            response = self.events_table.delete_item(Key={'eventId': event_id}, ReturnValues='ALL_OLD')
         except ClientError:
             return False
+        if 'Attributes' in response and self.stats_updates == 'request':
+            self.stats.apply_event_change(Event(**response['Attributes']), None)
+        return True
 
     # User methods
     def create_user(self, user: UserCreate) -> User:
@@ -93,6 +213,12 @@ class DynamoDBClient:
         return User(**item)
 
     def get_user(self, user_id: str) -> Optional[User]:
+        return self.read_flights.do(('user', user_id), lambda: self._fetch_user(user_id))
+
+    async def get_user_async(self, user_id: str) -> Optional[User]:
+        return await self.read_flights.do_async(('user', user_id), lambda: self._fetch_user(user_id))
+
+    def _fetch_user(self, user_id: str) -> Optional[User]:
         try:
             response = self.users_table.get_item(Key={'userId': user_id})
             if 'Item' in response:
@@ -111,6 +237,15 @@ class DynamoDBClient:
     # Registration methods
     def get_registration(self, user_id: str, event_id: str) -> Optional[Registration]:
         try:
+            if self.uses_composite_registrations:
+                response = self.registrations_table.get_item(
+                    Key={'eventId': event_id, 'userId': user_id},
+                    ConsistentRead=True
+                )
+                if 'Item' in response:
+                    return Registration(**response['Item'])
+                return None
+
             response = self.registrations_table.query(
                 IndexName='userId-eventId-index',
                 KeyConditionExpression='userId = :uid AND eventId = :eid',
@@ -127,61 +262,362 @@ class DynamoDBClient:
             return None
 
     def create_registration(self, registration: Registration) -> Registration:
-        item = registration.model_dump()
-        self.registrations_table.put_item(Item=item)
+        item = registration.model_dump(exclude_none=True)
+        if self.uses_composite_registrations:
+            try:
+                self.registrations_table.put_item(
+                    Item=item,
+                    ConditionExpression='attribute_not_exists(userId)'
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                    raise DuplicateRegistrationError(
+                        f"User {registration.userId} already has a registration for event {registration.eventId}"
+                    )
+                raise
+        else:
+            self.registrations_table.put_item(Item=item)
+        self._mirror_put_registration(item)
         return registration
 
-    def delete_registration(self, registration_id: str) -> bool:
+    def create_waitlisted_registration(self, registration: Registration) -> Registration:
+        """Claim the next waitlist sequence number and put the waitlist entry.
+
+        Fills in waitlistSeq and waitlistPosition. When the put fails, e.g. on a
+        duplicate, the number is recorded as removed so the entries behind it
+        keep exact positions.
+        """
+        seq, position = self.waitlist.allocate(registration.eventId)
+        registration = registration.model_copy(update={'waitlistSeq': seq, 'waitlistPosition': position})
         try:
-            self.registrations_table.delete_item(Key={'registrationId': registration_id})
-            return True
+            return self.create_registration(registration)
+        except Exception:
+            self.waitlist.record_removal(registration.eventId, seq)
+            raise
+
+    def delete_registration(self, registration: Registration) -> bool:
+        try:
+            self.registrations_table.delete_item(
+                Key=registration_key(registration, self.registrations_key_schema)
+            )
         except ClientError:
             return False
+        self._mirror_delete_registration(registration)
+        if registration.status == 'waitlisted' and registration.waitlistSeq is not None:
+            self.waitlist.record_removal(registration.eventId, registration.waitlistSeq)
+        return True
+
+    def delete_registrations(self, registrations: List[Registration]):
+        """Batch-delete registrations without touching event or waitlist counters.
+
+        Only for removing whole events, e.g. when archiving them.
+        """
+        tables = [(self.registrations_table, self.registrations_key_schema)]
+        if self.registrations_mirror_table is not None:
+            tables.append((self.registrations_mirror_table, self.registrations_mirror_key_schema))
+        for table, key_schema in tables:
+            with table.batch_writer() as batch:
+                for registration in registrations:
+                    batch.delete_item(Key=registration_key(registration, key_schema))
+
+    def _mirror_put_registration(self, item: dict):
+        if self.registrations_mirror_table is None:
+            return
+        try:
+            self.registrations_mirror_table.put_item(Item=item)
+        except ClientError as e:
+            # The primary write already succeeded; the migration verify pass repairs drift
+            logger.warning("Mirror write failed for registration %s: %s", item['registrationId'], e)
+
+    def _mirror_delete_registration(self, registration: Registration):
+        if self.registrations_mirror_table is None:
+            return
+        try:
+            self.registrations_mirror_table.delete_item(
+                Key=registration_key(registration, self.registrations_mirror_key_schema)
+            )
+        except ClientError as e:
+            logger.warning("Mirror delete failed for registration %s: %s", registration.registrationId, e)
 
     def get_event_registrations(self, event_id: str, status: Optional[str] = None) -> List[Registration]:
         try:
             if status:
-                response = self.registrations_table.query(
-                    IndexName='eventId-status-index',
-                    KeyConditionExpression='eventId = :eid AND #status = :status',
-                    ExpressionAttributeNames={'#status': 'status'},
-                    ExpressionAttributeValues={
+                kwargs = {
+                    'IndexName': 'eventId-status-index',
+                    'KeyConditionExpression': 'eventId = :eid AND #status = :status',
+                    'ExpressionAttributeNames': {'#status': 'status'},
+                    'ExpressionAttributeValues': {
                         ':eid': event_id,
                         ':status': status
                     }
-                )
+                }
+            elif self.uses_composite_registrations:
+                kwargs = {
+                    'KeyConditionExpression': 'eventId = :eid',
+                    'ExpressionAttributeValues': {':eid': event_id},
+                    'ConsistentRead': True
+                }
             else:
-                response = self.registrations_table.query(
-                    IndexName='eventId-status-index',
-                    KeyConditionExpression='eventId = :eid',
-                    ExpressionAttributeValues={':eid': event_id}
-                )
-            return [Registration(**item) for item in response.get('Items', [])]
+                kwargs = {
+                    'IndexName': 'eventId-status-index',
+                    'KeyConditionExpression': 'eventId = :eid',
+                    'ExpressionAttributeValues': {':eid': event_id}
+                }
+
+            # Large events and waitlists span several 1 MB query pages
+            registrations = []
+            while True:
+                response = self.registrations_table.query(**kwargs)
+                registrations.extend(Registration(**item) for item in response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    return registrations
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
         except ClientError:
             return []
 
-    def get_user_registrations(self, user_id: str) -> List[Registration]:
+    @property
+    def user_date_index_key_names(self) -> set:
+        """Attributes of a LastEvaluatedKey from userId-eventDate-index."""
+        table_keys = {'eventId', 'userId'} if self.uses_composite_registrations else {'registrationId'}
+        return table_keys | {'userId', 'eventDate'}
+
+    def query_user_registrations_by_date(
+        self,
+        user_id: str,
+        from_date: Optional[str] = None,
+        limit: Optional[int] = None,
+        exclusive_start_key: Optional[dict] = None
+    ) -> Tuple[List[Registration], Optional[dict]]:
+        """Return one page of a user's registrations ordered by event date.
+
+        Returns the registrations and the key to resume from, or None on the last page.
+        """
+        key_condition = 'userId = :uid'
+        values = {':uid': user_id}
+        if from_date:
+            key_condition += ' AND eventDate >= :from'
+            values[':from'] = from_date
+
+        kwargs = {
+            'IndexName': 'userId-eventDate-index',
+            'KeyConditionExpression': key_condition,
+            'ExpressionAttributeValues': values
+        }
+        if limit:
+            kwargs['Limit'] = limit
+        if exclusive_start_key:
+            kwargs['ExclusiveStartKey'] = exclusive_start_key
+
+        response = self.registrations_table.query(**kwargs)
+        registrations = [Registration(**item) for item in response.get('Items', [])]
+        return registrations, response.get('LastEvaluatedKey')
+
+    def batch_get_events(self, event_ids: List[str]) -> Dict[str, Event]:
+        events = {}
+        unique_ids = list(dict.fromkeys(event_ids))
+        # BatchGetItem accepts at most 100 keys per call
+        for start in range(0, len(unique_ids), 100):
+            request_items = {
+                self.events_table_name: {
+                    'Keys': [{'eventId': event_id} for event_id in unique_ids[start:start + 100]]
+                }
+            }
+            while request_items:
+                response = self.dynamodb.batch_get_item(RequestItems=request_items)
+                for item in response.get('Responses', {}).get(self.events_table_name, []):
+                    events[item['eventId']] = Event(**item)
+                request_items = response.get('UnprocessedKeys')
+        return events
+
+    def update_registration_event_fields(self, event: Event):
+        """Refresh the event date and title copied onto the event's registrations.
+
+        Updates run in parallel on FANOUT_CONCURRENCY threads. Raises if any
+        copy could not be updated; rerunning is harmless.
+        """
+        tables = [(self.registrations_table, self.registrations_key_schema)]
+        if self.registrations_mirror_table is not None:
+            tables.append((self.registrations_mirror_table, self.registrations_mirror_key_schema))
+
+        def update(registration: Registration) -> int:
+            failed = 0
+            for table, key_schema in tables:
+                try:
+                    table.update_item(
+                        Key=registration_key(registration, key_schema),
+                        UpdateExpression='SET eventDate = :date, eventTitle = :title',
+                        ConditionExpression='attribute_exists(userId)',
+                        ExpressionAttributeValues={':date': event.date, ':title': event.title}
+                    )
+                except ClientError as e:
+                    # Deleted since the query read it
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        logger.error("Error updating event fields on registration %s: %s", registration.registrationId, e)
+                        failed += 1
+                except BotoCoreError as e:
+                    logger.error("Error updating event fields on registration %s: %s", registration.registrationId, e)
+                    failed += 1
+            return failed
+
+        with ThreadPoolExecutor(max_workers=FANOUT_CONCURRENCY) as executor:
+            failed = sum(executor.map(update, self.get_event_registrations(event.eventId)))
+        if failed:
+            raise RuntimeError(f"{failed} registration copies of event {event.eventId} were not updated")
+
+    def _refresh_registration_event_fields(self, event: Event):
         try:
-            response = self.registrations_table.query(
-                IndexName='userId-eventId-index',
-                KeyConditionExpression='userId = :uid',
-                ExpressionAttributeValues={':uid': user_id}
-            )
-            return [Registration(**item) for item in response.get('Items', [])]
-        except ClientError:
-            return []
+            self.update_registration_event_fields(event)
+        except Exception as e:
+            logger.error("Error refreshing registrations of event %s: %s", event.eventId, e)
 
     def increment_event_count(self, event_id: str, field: str, amount: int = 1):
+        self.adjust_event_counts(event_id, {field: amount})
+
+    def adjust_event_counts(self, event_id: str, deltas: Dict[str, int]):
+        """Apply several counter deltas to an event in a single update."""
+        update_expression = 'SET ' + ', '.join(
+            f'{field} = if_not_exists({field}, :zero) + :{field}' for field in deltas
+        )
+        values = {f':{field}': amount for field, amount in deltas.items()}
+        values[':zero'] = 0
         try:
-            self.events_table.update_item(
+            response = self.events_table.update_item(
                 Key={'eventId': event_id},
-                UpdateExpression=f'SET {field} = if_not_exists({field}, :zero) + :val',
-                ExpressionAttributeValues={':val': amount, ':zero': 0}
+                UpdateExpression=update_expression,
+                ExpressionAttributeValues=values,
+                ReturnValues='ALL_NEW' if self.stats_updates == 'request' else 'NONE'
             )
         except ClientError as e:
-            print(f"Error incrementing {field} for event {event_id}: {str(e)}")
-            pass
+            logger.error("Error adjusting %s for event %s: %s", ', '.join(deltas), event_id, e)
+            return
+
+        if self.stats_updates == 'request' and response['Attributes'].get('status') == 'active':
+            registered = deltas.get('registeredCount', 0)
+            self.stats.apply({'registered': registered, 'waitlisted': deltas.get('waitlistCount', 0)})
+            if registered:
+                self.stats.record_fill(registered)
+
+    def promote_waitlisted(self, event: Event, count: int) -> List[str]:
+        """Promote the first `count` waitlisted users of an event to registered.
+
+        Promotions are written in transactions of up to 100 items, several at a
+        time, and the event counters are adjusted once at the end. A transaction
+        that loses a race with a concurrent unregistration is retried one user
+        at a time. Returns the promoted user IDs in waitlist order.
+        """
+        if count <= 0:
+            return []
+        waitlist = self.get_waitlist_users(event.eventId)[:count]
+        if not waitlist:
+            return []
+
+        promoted_at = datetime.utcnow().isoformat() + 'Z'
+        promotions = [
+            (entry, Registration(
+                registrationId=str(uuid.uuid4()),
+                userId=entry.userId,
+                eventId=event.eventId,
+                status='registered',
+                registeredAt=promoted_at,
+                waitlistPosition=None,
+                eventDate=event.date,
+                eventTitle=event.title
+            ))
+            for entry in waitlist
+        ]
+
+        per_transaction = TRANSACTION_MAX_ITEMS // len(self._promotion_actions(*promotions[0]))
+        chunks = [promotions[i:i + per_transaction] for i in range(0, len(promotions), per_transaction)]
+        with ThreadPoolExecutor(max_workers=min(PROMOTION_CONCURRENCY, len(chunks))) as executor:
+            # Each chunk runs in a copy of the request's context, so its calls are
+            # profiled and its log lines carry the request ID
+            futures = [
+                executor.submit(contextvars.copy_context().run, self._promote_chunk, chunk)
+                for chunk in chunks
+            ]
+            promoted = [pair for future in futures for pair in future.result()]
+        if not promoted:
+            return []
+
+        self.adjust_event_counts(event.eventId, {
+            'registeredCount': len(promoted),
+            'waitlistCount': -len(promoted)
+        })
+        self.waitlist.record_removals(
+            event.eventId,
+            [entry.waitlistSeq for entry, _ in promoted if entry.waitlistSeq is not None]
+        )
+        for entry, registration in promoted:
+            self._mirror_delete_registration(entry)
+            self._mirror_put_registration(registration.model_dump(exclude_none=True))
+        return [registration.userId for _, registration in promoted]
+
+    def _promotion_actions(self, entry: Registration, registration: Registration) -> List[dict]:
+        # The resource's client serializes plain Python values, as the Table methods do
+        table = self.registrations_table_name
+        item = registration.model_dump(exclude_none=True)
+        if self.uses_composite_registrations:
+            # Same key as the waitlist entry, so overwrite it in place
+            return [{'Put': {
+                'TableName': table,
+                'Item': item,
+                'ConditionExpression': 'registrationId = :rid AND #status = :waitlisted',
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': {
+                    ':rid': entry.registrationId,
+                    ':waitlisted': 'waitlisted'
+                }
+            }}]
+        return [
+            {'Delete': {
+                'TableName': table,
+                'Key': {'registrationId': entry.registrationId},
+                'ConditionExpression': '#status = :waitlisted',
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': {':waitlisted': 'waitlisted'}
+            }},
+            {'Put': {
+                'TableName': table,
+                'Item': item,
+                'ConditionExpression': 'attribute_not_exists(registrationId)'
+            }}
+        ]
+
+    def _promote_chunk(self, chunk: List[Tuple[Registration, Registration]]) -> List[Tuple[Registration, Registration]]:
+        actions = [action for pair in chunk for action in self._promotion_actions(*pair)]
+        try:
+            self.dynamodb.meta.client.transact_write_items(TransactItems=actions)
+            return chunk
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                logger.error("Error promoting waitlisted users for event %s: %s", chunk[0][0].eventId, e)
+                return []
+        except BotoCoreError as e:
+            logger.error("Error promoting waitlisted users for event %s: %s", chunk[0][0].eventId, e)
+            return []
+        if len(chunk) == 1:
+            # The entry left the waitlist after it was read
+            return []
+        return [pair for single in chunk for pair in self._promote_chunk([single])]
 
     def get_waitlist_users(self, event_id: str) -> List[Registration]:
         registrations = self.get_event_registrations(event_id, 'waitlisted')
-        return sorted(registrations, key=lambda x: x.registeredAt)
+        # Entries from before sequence numbers existed joined first
+        return sorted(
+            registrations,
+            key=lambda x: (x.waitlistSeq is not None, x.waitlistSeq or 0, x.registeredAt)
+        )
+
+    def get_waitlist_rank(self, registration: Registration) -> Tuple[int, int]:
+        """Return the current (position, waitlist size) of a waitlisted registration."""
+        if registration.waitlistSeq is not None:
+            rank = self.waitlist.rank(registration.eventId, registration.waitlistSeq)
+            if rank is not None:
+                return rank
+
+        # Registrations without a sequence number fall back to ordering the whole waitlist
+        waitlist = self.get_waitlist_users(registration.eventId)
+        for index, entry in enumerate(waitlist):
+            if entry.userId == registration.userId:
+                return index + 1, len(waitlist)
+        return len(waitlist) + 1, len(waitlist)
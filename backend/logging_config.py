@@ -0,0 +1,120 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Per-request context, set by the request logging middleware in main.py
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('request_id', default=None)
+route_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('route', default=None)
+sampled_var: contextvars.ContextVar[bool] = contextvars.ContextVar('sampled', default=True)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['requestId'] = record.request_id
+        if getattr(record, 'route', None):
+            entry['route'] = record.route
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request context and applies route sampling.
+
+    Runs on the calling thread, where the request's context variables are visible.
+    The sampling decision is made once per request so a request's log lines are
+    either all kept or all dropped; warnings and errors are always kept.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.route = route_var.get()
+        return record.levelno >= logging.WARNING or sampled_var.get()
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_sample_rates(value: Optional[str]) -> Dict[str, float]:
+    # LOG_SAMPLE_RATES='{"GET /events/{event_id}": 0.1, "GET /health": 0}'
+    if not value:
+        return {}
+    return {route: float(rate) for route, rate in json.loads(value).items()}
+
+
+class RouteSampler:
+    def __init__(self, rates: Dict[str, float], default_rate: float = 1.0):
+        self.rates = rates
+        self.default_rate = default_rate
+
+    def should_log(self, route: Optional[str]) -> bool:
+        rate = self.rates.get(route, self.default_rate)
+        if rate >= 1.0:
+            return True
+        return random.random() < rate
+
+
+def shutdown_logging():
+    # Drains the queue so lines logged just before shutdown are not lost
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging() -> RouteSampler:
+    """Install JSON logging on the root logger and return the route sampler.
+
+    Records are handed to a background thread through a queue unless running on
+    Lambda, where the execution environment is frozen between invocations and a
+    background writer could lose buffered lines.
+    """
+    global _listener
+
+    level = os.getenv('LOG_LEVEL', 'INFO').upper()
+    use_queue = os.getenv('LOG_ASYNC', 'false' if os.getenv('AWS_LAMBDA_FUNCTION_NAME') else 'true').lower() == 'true'
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(JsonFormatter())
+
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        handler = DeferredQueueHandler(log_queue)
+        if _listener is not None:
+            _listener.stop()
+        else:
+            atexit.register(shutdown_logging)
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = stream_handler
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
+
+    return RouteSampler(
+        parse_sample_rates(os.getenv('LOG_SAMPLE_RATES')),
+        float(os.getenv('LOG_SAMPLE_DEFAULT_RATE', '1.0'))
+    )
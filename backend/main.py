@@ -1,21 +1,30 @@
-from fastapi import FastAPI, HTTPException, Request, status
+from fastapi import FastAPI, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
-from typing import List
+from typing import List, Optional, Union
+import base64
+import binascii
+import json
 from datetime import datetime
 import uuid
 import re
 from models import (
-    Event, EventCreate, EventUpdate,
+    Event, EventCreate, EventUpdate, EventUpdateResponse,
     User, UserCreate,
     Registration, RegistrationCreate, RegistrationResponse,
-    UserRegistrationDetail
+    UserRegistrationDetail, UserRegistrationPage, PaginationInfo,
+    OccupancyStats, WaitlistRank
 )
-from database import DynamoDBClient
+from database import DynamoDBClient, DuplicateRegistrationError
+from logging_config import configure_logging, request_id_var, route_var, sampled_var
+from profiling import ProfiledRoute, ProfileSession, profile_session_var, should_profile, write_profile
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
 import logging
+import time
 
-logging.basicConfig(level=logging.INFO)
+log_sampler = configure_logging()
 logger = logging.getLogger(__name__)
 
 app = FastAPI(
@@ -36,10 +45,76 @@ app.add_middleware(
 db = DynamoDBClient()
 
 
+class RequestContextRoute(ProfiledRoute):
+    """Route that tags the request context with its path template once matched.
+
+    The router sets ``scope["route"]`` to this route before calling ``handle``, so
+    the template comes for free instead of matching every route a second time.
+    """
+
+    async def handle(self, scope, receive, send):
+        route = f"{scope['method']} {scope['route'].path}"
+        # Not reset here: RequestContextMiddleware resets the variables after the response
+        route_var.set(route)
+        sampled_var.set(log_sampler.should_log(route))
+        profile = profile_session_var.get()
+        if profile is not None:
+            profile.route = route
+        await super().handle(scope, receive, send)
+
+
+app.router.route_class = RequestContextRoute
+
+
+class RequestContextMiddleware:
+    """Pure ASGI middleware; BaseHTTPMiddleware costs about half the throughput."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        request_id = headers.get("x-request-id") or str(uuid.uuid4())
+        # Until a route matches, e.g. for a 404
+        route = f"{scope['method']} {scope['path']}"
+        profile = ProfileSession(route, request_id) if should_profile(headers.get("x-profile")) else None
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                response_headers.append("X-Request-ID", request_id)
+                if profile is not None:
+                    response_headers.append("X-Profile-Id", profile.profile_id)
+            await send(message)
+
+        request_id_token = request_id_var.set(request_id)
+        route_token = route_var.set(route)
+        sampled_token = sampled_var.set(log_sampler.should_log(route))
+        profile_token = profile_session_var.set(profile)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            request_id_var.reset(request_id_token)
+            route_var.reset(route_token)
+            sampled_var.reset(sampled_token)
+            profile_session_var.reset(profile_token)
+        if profile is not None:
+            profile.wall_time = time.perf_counter() - started
+            # Keep the file write off the event loop
+            await run_in_threadpool(write_profile, profile)
+
+
+app.add_middleware(RequestContextMiddleware)
+
+
 # Global exception handlers
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    logger.error(f"Validation error: {exc.errors()}")
+    logger.error("Validation error: %s", exc.errors())
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={"detail": exc.errors(), "message": "Invalid input data"}
@@ -48,7 +123,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unexpected error: {str(exc)}")
+    logger.error("Unexpected error: %s", exc)
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": "Internal server error", "message": str(exc)}
@@ -65,60 +140,89 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+def get_metrics():
+    # Per-container counters; each Lambda container or server worker reports its own
+    return {"readCoalescing": db.read_flights.stats()}
+
+
 @app.post("/events", response_model=Event, status_code=201)
 def create_event(event: EventCreate):
     try:
-        logger.info(f"Creating event: {event.title}")
+        logger.info("Creating event: %s", event.title)
         return db.create_event(event)
     except Exception as e:
-        logger.error(f"Error creating event: {str(e)}")
+        logger.error("Error creating event: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create event")
 
 
 @app.get("/events", response_model=List[Event])
-def list_events():
+def list_events(
+    include_archived: bool = Query(False, alias="includeArchived", description="Also list archived events")
+):
     try:
         logger.info("Listing all events")
-        return db.list_events()
+        events = db.list_events()
+        if include_archived:
+            events.extend(db.archive.list_events())
+        return events
     except Exception as e:
-        logger.error(f"Error listing events: {str(e)}")
+        logger.error("Error listing events: %s", e)
         raise HTTPException(status_code=500, detail="Failed to retrieve events")
 
 
 @app.get("/events/{event_id}", response_model=Event)
-def get_event(event_id: str):
+def get_event(
+    event_id: str,
+    include_archived: bool = Query(False, alias="includeArchived", description="Fall back to archived events")
+):
     try:
-        logger.info(f"Getting event: {event_id}")
+        logger.info("Getting event: %s", event_id)
         event = db.get_event(event_id)
+        if not event and include_archived:
+            event = db.archive.get_event(event_id)
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
         return event
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting event: {str(e)}")
+        logger.error("Error getting event: %s", e)
         raise HTTPException(status_code=500, detail="Failed to retrieve event")
 
 
-@app.put("/events/{event_id}", response_model=Event)
+@app.put("/events/{event_id}", response_model=EventUpdateResponse)
 def update_event(event_id: str, event_update: EventUpdate):
     try:
-        logger.info(f"Updating event: {event_id}")
+        logger.info("Updating event: %s", event_id)
         event = db.update_event(event_id, event_update)
         if not event:
             raise HTTPException(status_code=404, detail="Event not found")
-        return event
+
+        # Fill seats added by a capacity increase from the waitlist, in FIFO order
+        promoted = []
+        open_seats = event.capacity - event.registeredCount
+        if event_update.capacity is not None and open_seats > 0 and event.waitlistCount > 0:
+            promoted = db.promote_waitlisted(event, open_seats)
+            if promoted:
+                logger.info("Promoted %s waitlisted users for event %s", len(promoted), event_id)
+                event = event.model_copy(update={
+                    'registeredCount': event.registeredCount + len(promoted),
+                    'waitlistCount': event.waitlistCount - len(promoted)
+                })
+
+        return EventUpdateResponse(**event.model_dump(), promotedUsers=promoted)
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error updating event: {str(e)}")
+        logger.error("Error updating event: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update event")
 
 
 @app.delete("/events/{event_id}", status_code=204)
 def delete_event(event_id: str):
     try:
-        logger.info(f"Deleting event: {event_id}")
+        logger.info("Deleting event: %s", event_id)
         success = db.delete_event(event_id)
         if not success:
             raise HTTPException(status_code=404, detail="Event not found")
@@ -126,25 +230,35 @@ def delete_event(event_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error deleting event: {str(e)}")
+        logger.error("Error deleting event: %s", e)
         raise HTTPException(status_code=500, detail="Failed to delete event")
 
 
+@app.get("/stats", response_model=OccupancyStats)
+def get_stats():
+    try:
+        logger.info("Getting occupancy stats")
+        return db.stats.read()
+    except Exception as e:
+        logger.error("Error getting stats: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to retrieve stats")
+
+
 # User endpoints
 @app.post("/users", response_model=User, status_code=201)
 def create_user(user: UserCreate):
     try:
-        logger.info(f"Creating user: {user.name}")
+        logger.info("Creating user: %s", user.name)
         return db.create_user(user)
     except Exception as e:
-        logger.error(f"Error creating user: {str(e)}")
+        logger.error("Error creating user: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create user")
 
 
 @app.get("/users/{user_id}", response_model=User)
 def get_user(user_id: str):
     try:
-        logger.info(f"Getting user: {user_id}")
+        logger.info("Getting user: %s", user_id)
         user = db.get_user(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -152,7 +266,7 @@ def get_user(user_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting user: {str(e)}")
+        logger.error("Error getting user: %s", e)
         raise HTTPException(status_code=500, detail="Failed to retrieve user")
 
 
@@ -162,7 +276,7 @@ def list_users():
         logger.info("Listing all users")
         return db.list_users()
     except Exception as e:
-        logger.error(f"Error listing users: {str(e)}")
+        logger.error("Error listing users: %s", e)
         raise HTTPException(status_code=500, detail="Failed to retrieve users")
 
 
@@ -183,6 +297,19 @@ def validate_id(value: str, field_name: str):
         )
 
 
+def registration_conflict(existing_registration: Registration) -> HTTPException:
+    if existing_registration.status == "registered":
+        return HTTPException(
+            status_code=409,
+            detail="User is already registered for this event"
+        )
+    position, _ = db.get_waitlist_rank(existing_registration)
+    return HTTPException(
+        status_code=409,
+        detail=f"User is already on the waitlist at position {position}"
+    )
+
+
 @app.post("/events/{event_id}/registrations", response_model=RegistrationResponse, status_code=201)
 def register_for_event(event_id: str, registration: RegistrationCreate):
     try:
@@ -190,7 +317,7 @@ def register_for_event(event_id: str, registration: RegistrationCreate):
         validate_id(user_id, "userId")
         validate_id(event_id, "eventId")
         
-        logger.info(f"User {user_id} registering for event {event_id}")
+        logger.info("User %s registering for event %s", user_id, event_id)
         
         # Check if user exists
         user = db.get_user(user_id)
@@ -205,16 +332,7 @@ def register_for_event(event_id: str, registration: RegistrationCreate):
         # Check if user is already registered or waitlisted
         existing_registration = db.get_registration(user_id, event_id)
         if existing_registration:
-            if existing_registration.status == "registered":
-                raise HTTPException(
-                    status_code=409,
-                    detail="User is already registered for this event"
-                )
-            else:
-                raise HTTPException(
-                    status_code=409,
-                    detail=f"User is already on the waitlist at position {existing_registration.waitlistPosition}"
-                )
+            raise registration_conflict(existing_registration)
         
         # Check capacity
         if event.registeredCount < event.capacity:
@@ -227,12 +345,14 @@ def register_for_event(event_id: str, registration: RegistrationCreate):
                 eventId=event_id,
                 status="registered",
                 registeredAt=registered_at,
-                waitlistPosition=None
+                waitlistPosition=None,
+                eventDate=event.date,
+                eventTitle=event.title
             )
             db.create_registration(new_registration)
             db.increment_event_count(event_id, 'registeredCount', 1)
             
-            logger.info(f"User {user_id} successfully registered for event {event_id}")
+            logger.info("User %s successfully registered for event %s", user_id, event_id)
             return RegistrationResponse(
                 registrationId=registration_id,
                 userId=user_id,
@@ -248,20 +368,20 @@ def register_for_event(event_id: str, registration: RegistrationCreate):
                 # Add to waitlist
                 registration_id = str(uuid.uuid4())
                 registered_at = datetime.utcnow().isoformat() + 'Z'
-                waitlist_position = event.waitlistCount + 1
                 
-                new_registration = Registration(
+                new_registration = db.create_waitlisted_registration(Registration(
                     registrationId=registration_id,
                     userId=user_id,
                     eventId=event_id,
                     status="waitlisted",
                     registeredAt=registered_at,
-                    waitlistPosition=waitlist_position
-                )
-                db.create_registration(new_registration)
+                    eventDate=event.date,
+                    eventTitle=event.title
+                ))
+                waitlist_position = new_registration.waitlistPosition
                 db.increment_event_count(event_id, 'waitlistCount', 1)
                 
-                logger.info(f"User {user_id} added to waitlist for event {event_id} at position {waitlist_position}")
+                logger.info("User %s added to waitlist for event %s at position %s", user_id, event_id, waitlist_position)
                 return RegistrationResponse(
                     registrationId=registration_id,
                     userId=user_id,
@@ -273,7 +393,7 @@ def register_for_event(event_id: str, registration: RegistrationCreate):
                 )
             else:
                 # No waitlist, reject
-                logger.info(f"Registration denied for user {user_id} - event {event_id} is full")
+                logger.info("Registration denied for user %s - event %s is full", user_id, event_id)
                 raise HTTPException(
                     status_code=409,
                     detail=f"Event is at full capacity ({event.capacity}/{event.capacity}). No waitlist available."
@@ -281,8 +401,17 @@ def register_for_event(event_id: str, registration: RegistrationCreate):
     
     except HTTPException:
         raise
+    except DuplicateRegistrationError:
+        # Lost a race against a concurrent registration for the same user and event
+        existing_registration = db.get_registration(registration.userId, event_id)
+        if existing_registration:
+            raise registration_conflict(existing_registration)
+        raise HTTPException(
+            status_code=409,
+            detail="User is already registered for this event"
+        )
     except Exception as e:
-        logger.error(f"Error registering for event: {str(e)}")
+        logger.error("Error registering for event: %s", e)
         raise HTTPException(status_code=500, detail="Failed to register for event")
 
 
@@ -292,7 +421,7 @@ def unregister_from_event(event_id: str, user_id: str):
         validate_id(user_id, "userId")
         validate_id(event_id, "eventId")
         
-        logger.info(f"User {user_id} unregistering from event {event_id}")
+        logger.info("User %s unregistering from event %s", user_id, event_id)
         
         # Check if registration exists
         registration = db.get_registration(user_id, event_id)
@@ -308,122 +437,206 @@ def unregister_from_event(event_id: str, user_id: str):
             raise HTTPException(status_code=404, detail="Event not found")
         
         # Delete registration
-        db.delete_registration(registration.registrationId)
+        db.delete_registration(registration)
         
         if registration.status == "registered":
             db.increment_event_count(event_id, 'registeredCount', -1)
             
             # Check if there's a waitlist to promote
             if event.hasWaitlist and event.waitlistCount > 0:
-                waitlist_users = db.get_waitlist_users(event_id)
-                if waitlist_users:
-                    # Promote first user from waitlist
-                    first_waitlisted = waitlist_users[0]
-                    
-                    # Delete old waitlist registration
-                    db.delete_registration(first_waitlisted.registrationId)
-                    
-                    # Create new registered registration
-                    new_registration_id = str(uuid.uuid4())
-                    promoted_registration = Registration(
-                        registrationId=new_registration_id,
-                        userId=first_waitlisted.userId,
-                        eventId=event_id,
-                        status="registered",
-                        registeredAt=datetime.utcnow().isoformat() + 'Z',
-                        waitlistPosition=None
-                    )
-                    db.create_registration(promoted_registration)
-                    
-                    # Update counts
-                    db.increment_event_count(event_id, 'registeredCount', 1)
-                    db.increment_event_count(event_id, 'waitlistCount', -1)
-                    
-                    logger.info(f"Promoted user {first_waitlisted.userId} from waitlist to registered")
-                    
+                promoted = db.promote_waitlisted(event, 1)
+                if promoted:
+                    logger.info("Promoted user %s from waitlist to registered", promoted[0])
+
                     return {
                         "message": "Successfully unregistered from event",
-                        "promotedUser": first_waitlisted.userId
+                        "promotedUser": promoted[0]
                     }
-            
-            logger.info(f"User {user_id} successfully unregistered from event {event_id}")
+
+            logger.info("User %s successfully unregistered from event %s", user_id, event_id)
             return {"message": "Successfully unregistered from event"}
         
         else:  # waitlisted
             db.increment_event_count(event_id, 'waitlistCount', -1)
-            logger.info(f"User {user_id} removed from waitlist for event {event_id}")
+            logger.info("User %s removed from waitlist for event %s", user_id, event_id)
             return {"message": "Successfully removed from waitlist"}
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error unregistering from event: {str(e)}")
+        logger.error("Error unregistering from event: %s", e)
         raise HTTPException(status_code=500, detail="Failed to unregister from event")
 
 
+@app.get("/events/{event_id}/waitlist/{user_id}", response_model=WaitlistRank)
+def get_waitlist_position(event_id: str, user_id: str):
+    try:
+        validate_id(user_id, "userId")
+        validate_id(event_id, "eventId")
+
+        logger.info("Getting waitlist position of user %s for event %s", user_id, event_id)
+
+        registration = db.get_registration(user_id, event_id)
+        if not registration or registration.status != "waitlisted":
+            raise HTTPException(status_code=404, detail="User is not on the waitlist for this event")
+
+        position, size = db.get_waitlist_rank(registration)
+        return WaitlistRank(
+            eventId=event_id,
+            userId=user_id,
+            waitlistPosition=position,
+            waitlistSize=size
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error getting waitlist position: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to retrieve waitlist position")
+
+
 @app.get("/events/{event_id}/registrations")
-def get_event_registrations(event_id: str):
+def get_event_registrations(
+    event_id: str,
+    include_archived: bool = Query(False, alias="includeArchived", description="Fall back to archived events")
+):
     try:
         validate_id(event_id, "eventId")
         
-        logger.info(f"Getting registrations for event {event_id}")
+        logger.info("Getting registrations for event %s", event_id)
         
         # Check if event exists
         event = db.get_event(event_id)
-        if not event:
+        if event:
+            # Get all registrations for event
+            registrations = db.get_event_registrations(event_id)
+        elif include_archived and db.archive.get_event(event_id):
+            registrations = db.archive.get_event_registrations(event_id)
+        else:
             raise HTTPException(status_code=404, detail="Event not found")
         
-        # Get all registrations for event
-        registrations = db.get_event_registrations(event_id)
-        
-        logger.info(f"Found {len(registrations)} registrations for event {event_id}")
+        logger.info("Found %s registrations for event %s", len(registrations), event_id)
         return registrations
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting event registrations: {str(e)}")
+        logger.error("Error getting event registrations: %s", e)
         raise HTTPException(status_code=500, detail="Failed to retrieve event registrations")
 
 
-@app.get("/users/{user_id}/registrations", response_model=List[UserRegistrationDetail])
-def get_user_registrations(user_id: str):
+def encode_cursor(last_evaluated_key: Optional[dict]) -> Optional[str]:
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+
+def decode_cursor(cursor: str, user_id: str, from_date: Optional[str]) -> dict:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        key = None
+    # Anything else would reach DynamoDB as a malformed or out-of-range ExclusiveStartKey
+    valid = (
+        isinstance(key, dict)
+        and set(key) == db.user_date_index_key_names
+        and all(isinstance(value, str) for value in key.values())
+        and key['userId'] == user_id
+        and (not from_date or key['eventDate'] >= from_date)
+    )
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+@app.get(
+    "/users/{user_id}/registrations",
+    response_model=Union[UserRegistrationPage, List[UserRegistrationDetail]]
+)
+def get_user_registrations(
+    user_id: str,
+    from_date: Optional[str] = Query(None, alias="from", description="Only events on or after this ISO date"),
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Page size; enables the paginated response"),
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
+    include_archived: bool = Query(
+        False, alias="includeArchived", description="Also list archived events; not available with pagination"
+    )
+):
     try:
         validate_id(user_id, "userId")
-        
-        logger.info(f"Getting registrations for user {user_id}")
-        
+
+        logger.info("Getting registrations for user %s", user_id)
+
         # Check if user exists
         user = db.get_user(user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        
-        # Get all registrations for user
-        registrations = db.get_user_registrations(user_id)
-        
-        # Get event details for each registration
-        result = []
-        for reg in registrations:
-            event = db.get_event(reg.eventId)
-            if event:
-                result.append(UserRegistrationDetail(
-                    registration=reg,
-                    event=event
-                ))
-        
-        # Sort by event date
-        result.sort(key=lambda x: x.event.date)
-        
-        logger.info(f"Found {len(result)} registrations for user {user_id}")
-        return result
-    
+
+        paginated = limit is not None or cursor is not None
+        if paginated and include_archived:
+            raise HTTPException(status_code=400, detail="includeArchived cannot be combined with limit or cursor")
+        page_size = (limit or 20) if paginated else None
+        start_key = decode_cursor(cursor, user_id, from_date) if cursor else None
+
+        # Registrations come back ordered by the event date copied onto them
+        registrations = []
+        while True:
+            page, start_key = db.query_user_registrations_by_date(
+                user_id,
+                from_date=from_date,
+                limit=page_size,
+                exclusive_start_key=start_key
+            )
+            registrations.extend(page)
+            if not start_key or paginated:
+                break
+
+        # Get event details for this page only
+        events = db.batch_get_events([reg.eventId for reg in registrations])
+
+        if include_archived:
+            archived = db.archive.query_user_registrations_by_date(user_id, from_date=from_date)
+            events.update(db.archive.batch_get_events([reg.eventId for reg in archived]))
+            registrations = sorted(registrations + archived, key=lambda reg: reg.eventDate or '')
+        result = [
+            UserRegistrationDetail(registration=reg, event=events[reg.eventId])
+            for reg in registrations
+            if reg.eventId in events
+        ]
+
+        logger.info("Found %s registrations for user %s", len(result), user_id)
+        if not paginated:
+            return result
+        return UserRegistrationPage(
+            data=result,
+            pagination=PaginationInfo(
+                limit=page_size,
+                hasNext=start_key is not None,
+                nextCursor=encode_cursor(start_key)
+            )
+        )
+
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting user registrations: {str(e)}")
+        logger.error("Error getting user registrations: %s", e)
         raise HTTPException(status_code=500, detail="Failed to retrieve user registrations")
 
 
 # Lambda handler
 from mangum import Mangum
-handler = Mangum(app)
+from warmup import is_warmup_event, prime_container, prime_on_init_enabled
+
+asgi_handler = Mangum(app)
+
+
+def handler(event, context):
+    # Scheduled warm-up pings skip the ASGI stack and just keep connections hot
+    if is_warmup_event(event):
+        prime_container(db, asgi_handler)
+        return {"warmed": True}
+    return asgi_handler(event, context)
+
+
+if prime_on_init_enabled():
+    prime_container(db, asgi_handler)
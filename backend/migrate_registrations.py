@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Online migration of the Registrations table between key schemas.
+
+Moves registrations from the legacy table (partition key ``registrationId``)
+to a table keyed by ``eventId`` + ``userId`` without downtime:
+
+1. Create the composite-key table and deploy the API with
+   ``REGISTRATIONS_MIRROR_TABLE_NAME`` pointing at it. Every registration
+   write is now dual-written.
+2. ``python migrate_registrations.py backfill --source Registrations --target RegistrationsV2``
+   copies existing items with a parallel scan. Items already written by the
+   API are left untouched.
+3. ``python migrate_registrations.py verify --source Registrations --target RegistrationsV2 --fix``
+   repairs items missed, left stale or resurrected by races between the scan and
+   live traffic.
+4. Switch the API to ``REGISTRATIONS_KEY_SCHEMA=composite`` with
+   ``REGISTRATIONS_TABLE_NAME`` set to the new table and the mirror pointing at
+   the old one, then drop the mirror once satisfied.
+
+``denormalize`` copies each event's date and title onto registrations written
+before those fields existed, so they appear in ``userId-eventDate-index``:
+
+    python migrate_registrations.py denormalize --table Registrations
+"""
+
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import boto3
+from botocore.exceptions import ClientError
+
+
+def _table(table_name: str):
+    # boto3 resources are not thread safe, so every worker builds its own
+    return boto3.session.Session().resource('dynamodb').Table(table_name)
+
+
+def _scan_segment(table_name: str, segment: int, total_segments: int, **scan_kwargs):
+    table = _table(table_name)
+    kwargs = {'Segment': segment, 'TotalSegments': total_segments, **scan_kwargs}
+    while True:
+        response = table.scan(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def _backfill_segment(source: str, target: str, segment: int, total_segments: int) -> dict:
+    target_table = _table(target)
+    stats = {'copied': 0, 'skipped': 0}
+    for item in _scan_segment(source, segment, total_segments):
+        try:
+            # Never overwrite an item the API dual-wrote after the scan started
+            target_table.put_item(
+                Item=item,
+                ConditionExpression='attribute_not_exists(userId)'
+            )
+            stats['copied'] += 1
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            stats['skipped'] += 1
+    return stats
+
+
+def _verify_segment(source: str, target: str, segment: int, total_segments: int, fix: bool) -> dict:
+    source_table = _table(source)
+    target_table = _table(target)
+    stats = {'missing': 0, 'orphaned': 0, 'skipped': 0}
+
+    # Legacy items that never reached the composite table, or whose slot holds a
+    # registration that no longer exists (a failed mirror write left it stale)
+    for item in _scan_segment(source, segment, total_segments):
+        key = {'eventId': item['eventId'], 'userId': item['userId']}
+        existing = target_table.get_item(Key=key, ConsistentRead=True).get('Item')
+        if existing is None:
+            stats['missing'] += 1
+            if fix:
+                target_table.put_item(Item=item)
+        elif existing['registrationId'] != item['registrationId']:
+            stale_key = {'registrationId': existing['registrationId']}
+            if 'Item' in source_table.get_item(Key=stale_key, ConsistentRead=True):
+                continue
+            stats['missing'] += 1
+            if fix:
+                try:
+                    target_table.put_item(
+                        Item=item,
+                        # Another segment's orphan pass may have deleted the stale item
+                        ConditionExpression='attribute_not_exists(userId) OR registrationId = :stale',
+                        ExpressionAttributeValues={':stale': existing['registrationId']}
+                    )
+                except ClientError as e:
+                    # The API rewrote the item since it was read
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise
+                    stats['skipped'] += 1
+
+    # Composite items whose legacy registration was deleted while the backfill ran
+    for item in _scan_segment(target, segment, total_segments):
+        key = {'registrationId': item['registrationId']}
+        response = source_table.get_item(Key=key, ConsistentRead=True)
+        if 'Item' not in response:
+            stats['orphaned'] += 1
+            if fix:
+                try:
+                    target_table.delete_item(
+                        Key={'eventId': item['eventId'], 'userId': item['userId']},
+                        ConditionExpression='registrationId = :rid',
+                        ExpressionAttributeValues={':rid': item['registrationId']}
+                    )
+                except ClientError as e:
+                    # The API rewrote the item since the scan read it
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise
+                    stats['skipped'] += 1
+    return stats
+
+
+def _denormalize_segment(table_name: str, events_table_name: str, key_schema: str,
+                         segment: int, total_segments: int) -> dict:
+    table = _table(table_name)
+    events_table = _table(events_table_name)
+    events = {}
+    stats = {'updated': 0, 'orphaned': 0}
+    for item in _scan_segment(table_name, segment, total_segments,
+                              FilterExpression='attribute_not_exists(eventDate)'):
+        event_id = item['eventId']
+        if event_id not in events:
+            events[event_id] = events_table.get_item(Key={'eventId': event_id}).get('Item')
+        event = events[event_id]
+        if event is None:
+            stats['orphaned'] += 1
+            continue
+
+        if key_schema == 'composite':
+            key = {'eventId': event_id, 'userId': item['userId']}
+        else:
+            key = {'registrationId': item['registrationId']}
+        try:
+            table.update_item(
+                Key=key,
+                UpdateExpression='SET eventDate = :date, eventTitle = :title',
+                ConditionExpression='attribute_exists(userId)',
+                ExpressionAttributeValues={':date': event['date'], ':title': event['title']}
+            )
+            stats['updated'] += 1
+        except ClientError as e:
+            # Deleted since the scan read it
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+    return stats
+
+
+def _run_parallel(fn, segments: int) -> dict:
+    totals = {}
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        futures = [executor.submit(fn, segment, segments) for segment in range(segments)]
+        for future in futures:
+            for key, value in future.result().items():
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Migrate registrations to the eventId + userId key schema")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name in ('backfill', 'verify'):
+        sub = subparsers.add_parser(name)
+        sub.add_argument('--source', default='Registrations', help="Legacy table keyed by registrationId")
+        sub.add_argument('--target', required=True, help="Table keyed by eventId + userId")
+        sub.add_argument('--segments', type=int, default=8, help="Parallel scan segments")
+        if name == 'verify':
+            sub.add_argument('--fix', action='store_true', help="Repair missing and orphaned items")
+
+    sub = subparsers.add_parser('denormalize')
+    sub.add_argument('--table', default='Registrations', help="Registrations table to update")
+    sub.add_argument('--key-schema', choices=['legacy', 'composite'], default='legacy')
+    sub.add_argument('--events-table', default='Events')
+    sub.add_argument('--segments', type=int, default=8, help="Parallel scan segments")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'backfill':
+        totals = _run_parallel(partial(_backfill_segment, args.source, args.target), args.segments)
+    elif args.command == 'denormalize':
+        totals = _run_parallel(
+            partial(_denormalize_segment, args.table, args.events_table, args.key_schema),
+            args.segments
+        )
+    else:
+        totals = _run_parallel(
+            lambda segment, total: _verify_segment(args.source, args.target, segment, total, args.fix),
+            args.segments
+        )
+
+    print(f"{args.command}: " + ", ".join(f"{k}={v}" for k, v in sorted(totals.items())))
+    if args.command == 'verify' and not args.fix and any(totals.values()):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from datetime import datetime
 
 
@@ -68,6 +68,10 @@ class EventUpdate(BaseModel):
         return v
 
 
+class EventUpdateResponse(Event):
+    promotedUsers: List[str] = Field(default_factory=list, description="Users promoted from the waitlist by this update")
+
+
 # User models
 class User(BaseModel):
     userId: str = Field(..., description="Unique user identifier (UUID)")
@@ -88,6 +92,9 @@ class Registration(BaseModel):
     status: Literal["registered", "waitlisted"] = Field(..., description="Registration status")
     registeredAt: str = Field(..., description="ISO 8601 timestamp")
     waitlistPosition: Optional[int] = Field(None, description="Position in waitlist if applicable")
+    waitlistSeq: Optional[int] = Field(None, description="Waitlist sequence number, orders the waitlist")
+    eventDate: Optional[str] = Field(None, description="Copy of the event date, sort key of userId-eventDate-index")
+    eventTitle: Optional[str] = Field(None, description="Copy of the event title")
 
 
 class RegistrationCreate(BaseModel):
@@ -107,3 +114,38 @@ class RegistrationResponse(BaseModel):
 class UserRegistrationDetail(BaseModel):
     registration: Registration
     event: Event
+
+
+class WaitlistRank(BaseModel):
+    eventId: str
+    userId: str
+    waitlistPosition: int = Field(..., description="Current 1-based position in the waitlist")
+    waitlistSize: int = Field(..., description="Number of users currently on the waitlist")
+
+
+class PaginationInfo(BaseModel):
+    limit: int
+    hasNext: bool
+    nextCursor: Optional[str] = None
+
+
+class UserRegistrationPage(BaseModel):
+    data: List[UserRegistrationDetail]
+    pagination: PaginationInfo
+
+
+class OccupancyStats(BaseModel):
+    activeEvents: int = Field(..., description="Number of active events")
+    totalCapacity: int = Field(..., description="Combined capacity of active events")
+    registeredCount: int = Field(..., description="Registered seats across active events")
+    waitlistCount: int = Field(..., description="Waitlisted users across active events")
+    occupancyRate: float = Field(..., description="registeredCount / totalCapacity")
+    averageWaitlistDepth: float = Field(..., description="Waitlisted users per active event")
+    # Counted as seats change: registrations and promotions add to the hour they
+    # happen in and unregistrations subtract from theirs, on events active at the
+    # time. rebuild_stats.py can only see registrations that still exist, on events
+    # active now, so after a rebuild a cancelled seat is missing from the hour it
+    # was filled in instead of subtracted from the hour it was released in, and
+    # events completed since no longer count.
+    fillVelocityLastHour: int = Field(..., description="Net seats filled in the current hour")
+    fillVelocity24h: float = Field(..., description="Average net seats filled per hour over the last 24 hours")
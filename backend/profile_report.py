@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Aggregate profile dumps written by the profiling middleware.
+
+Prints collapsed stacks ("frame;frame;frame count") ready for flamegraph.pl,
+speedscope or inferno, or a per-route summary of wall time and DynamoDB calls.
+
+    python profile_report.py /tmp/profiles > stacks.txt && flamegraph.pl stacks.txt > flame.svg
+    python profile_report.py /tmp/profiles --route "POST /events/{event_id}/registrations"
+    python profile_report.py /tmp/profiles --summary
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+
+
+def load_profiles(directory: str, route=None):
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path) as f:
+            profile = json.load(f)
+        if route is None or profile['route'] == route:
+            yield profile
+
+
+def collapse(profiles) -> Counter:
+    stacks = Counter()
+    for profile in profiles:
+        stacks.update(profile['stacks'])
+    return stacks
+
+
+def summarize(profiles) -> dict:
+    routes = defaultdict(lambda: {'requests': 0, 'wallMs': 0.0, 'dynamodbMs': 0.0, 'operations': Counter()})
+    for profile in profiles:
+        entry = routes[profile['route']]
+        entry['requests'] += 1
+        entry['wallMs'] += profile['wallTimeMs']
+        entry['dynamodbMs'] += profile['dynamodb']['ms']
+        for operation, stats in profile['dynamodb']['byOperation'].items():
+            entry['operations'][operation] += stats['calls']
+    return routes
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Aggregate request profile dumps")
+    parser.add_argument('directory', nargs='?', default=os.getenv('PROFILE_DIR', '/tmp/profiles'))
+    parser.add_argument('--route', help='Only include this route, e.g. "GET /events/{event_id}"')
+    parser.add_argument('--summary', action='store_true', help="Per-route time and DynamoDB breakdown")
+    args = parser.parse_args(argv)
+
+    profiles = list(load_profiles(args.directory, args.route))
+    if not profiles:
+        print(f"No profiles found in {args.directory}", file=sys.stderr)
+        return 1
+
+    if args.summary:
+        for route, entry in sorted(summarize(profiles).items()):
+            n = entry['requests']
+            print(f"{route}: {n} requests, {entry['wallMs'] / n:.1f} ms avg, "
+                  f"{entry['dynamodbMs'] / n:.1f} ms avg in DynamoDB")
+            for operation, calls in entry['operations'].most_common():
+                print(f"    {operation}: {calls / n:.1f} calls/request")
+        return 0
+
+    for stack, count in collapse(profiles).most_common():
+        print(f"{stack} {count}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
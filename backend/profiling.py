@@ -0,0 +1,195 @@
+"""Opt-in per-request profiling.
+
+Disabled unless ``PROFILING_ENABLED=true``. A request is then profiled when it
+sends ``X-Profile`` equal to ``PROFILING_TOKEN`` or is picked by
+``PROFILING_SAMPLE_RATE``. Without a token the header is ignored, so clients
+cannot make the server profile and write dumps on demand. The route's endpoint is sampled every
+``PROFILING_INTERVAL_MS`` on the thread it runs on, DynamoDB calls made while
+handling it are timed, and the result is written as JSON to ``PROFILE_DIR``.
+``profile_report.py`` turns a directory of dumps into collapsed stacks for
+flame graph tools.
+"""
+
+import contextvars
+import functools
+import hmac
+import inspect
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from fastapi.routing import APIRoute
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN')
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL_MS', '2')) / 1000
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/tmp/profiles')
+
+profile_session_var: contextvars.ContextVar[Optional['ProfileSession']] = contextvars.ContextVar(
+    'profile_session', default=None
+)
+
+
+class ProfileSession:
+    def __init__(self, route: str, request_id: Optional[str]):
+        self.profile_id = uuid.uuid4().hex[:12]
+        self.route = route
+        self.request_id = request_id
+        self.started_at = datetime.now(timezone.utc)
+        self.wall_time = 0.0
+        self.interval = PROFILING_INTERVAL
+        self.stacks: Counter = Counter()
+        self.dynamodb_calls: List[dict] = []
+        self._lock = threading.Lock()
+
+    def add_dynamodb_call(self, operation: str, table: Optional[str], duration: float):
+        with self._lock:
+            self.dynamodb_calls.append({'operation': operation, 'table': table, 'ms': duration * 1000})
+
+    def to_dict(self) -> dict:
+        breakdown = {}
+        for call in self.dynamodb_calls:
+            key = f"{call['operation']} {call['table'] or ''}".strip()
+            entry = breakdown.setdefault(key, {'calls': 0, 'ms': 0.0})
+            entry['calls'] += 1
+            entry['ms'] += call['ms']
+        return {
+            'profileId': self.profile_id,
+            'route': self.route,
+            'requestId': self.request_id,
+            'startedAt': self.started_at.isoformat(),
+            'wallTimeMs': self.wall_time * 1000,
+            'intervalMs': self.interval * 1000,
+            'dynamodb': {
+                'calls': len(self.dynamodb_calls),
+                'ms': sum(call['ms'] for call in self.dynamodb_calls),
+                'byOperation': breakdown,
+            },
+            'stacks': dict(self.stacks),
+        }
+
+
+def should_profile(profile_header: Optional[str]) -> bool:
+    if not PROFILING_ENABLED:
+        return False
+    if profile_header is not None and PROFILING_TOKEN and hmac.compare_digest(profile_header, PROFILING_TOKEN):
+        return True
+    return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+
+def write_profile(session: ProfileSession, directory: str = PROFILE_DIR) -> str:
+    os.makedirs(directory, exist_ok=True)
+    slug = ''.join(c if c.isalnum() else '_' for c in session.route).strip('_')
+    path = os.path.join(directory, f"{session.started_at:%Y%m%dT%H%M%S}-{slug}-{session.profile_id}.json")
+    with open(path, 'w') as f:
+        json.dump(session.to_dict(), f)
+    return path
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler(threading.Thread):
+    """Samples the stack of one thread until stopped, down to a boundary frame."""
+
+    def __init__(self, thread_id: int, boundary_code, session: ProfileSession):
+        super().__init__(daemon=True, name='profile-sampler')
+        self.thread_id = thread_id
+        self.boundary_code = boundary_code
+        self.session = session
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.session.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None and frame.f_code is not self.boundary_code:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.session.stacks[';'.join([self.session.route] + labels[::-1])] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _profiled(endpoint: Callable) -> Callable:
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            session = profile_session_var.get()
+            if session is None:
+                return await endpoint(*args, **kwargs)
+            # Async endpoints share the event loop thread, so samples may include other requests
+            sampler = _StackSampler(threading.get_ident(), async_wrapper.__code__, session)
+            sampler.start()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                sampler.stop()
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = profile_session_var.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        sampler = _StackSampler(threading.get_ident(), wrapper.__code__, session)
+        sampler.start()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            sampler.stop()
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that can sample its endpoint on the thread it actually runs on.
+
+    Sync endpoints run in a threadpool, out of reach of anything running in the
+    middleware, so the hook has to sit around the endpoint itself.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if PROFILING_ENABLED:
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _before_call(context, **kwargs):
+    if profile_session_var.get() is not None:
+        context['profile_started'] = time.perf_counter()
+
+
+def _after_call(model, context, **kwargs):
+    session = profile_session_var.get()
+    started = context.get('profile_started')
+    if session is not None and started is not None:
+        params = context.get('profile_params') or {}
+        session.add_dynamodb_call(model.name, params.get('TableName'), time.perf_counter() - started)
+
+
+def _capture_params(params, context, **kwargs):
+    if profile_session_var.get() is not None:
+        context['profile_params'] = params
+
+
+def instrument_client(client):
+    """Time the client's DynamoDB calls for the active profile session, if any."""
+    if not PROFILING_ENABLED:
+        return
+    events = client.meta.events
+    events.register('provide-client-params.dynamodb', _capture_params)
+    events.register('before-call.dynamodb', _before_call)
+    events.register('after-call.dynamodb', _after_call)
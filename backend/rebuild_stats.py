@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Rebuild the occupancy aggregates served by GET /stats.
+
+Recomputes the totals from every event and the fill window from recent
+registrations, then overwrites the Stats table items. Use it to backfill a new
+Stats table or to repair drift. Updates made while the rebuild runs may be
+overwritten, so run it when registration traffic is quiet. Cancelled
+registrations no longer exist, so the rebuilt fill window can differ from the
+incrementally counted one (see OccupancyStats).
+
+    python rebuild_stats.py
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from database import DynamoDBClient
+from models import Event
+from stats import FILL_WINDOW_HOURS
+
+
+def scan_all(table, **kwargs):
+    while True:
+        response = table.scan(**kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def main():
+    db = DynamoDBClient()
+    now = datetime.now(timezone.utc)
+    window_start = (now - timedelta(hours=FILL_WINDOW_HOURS)).isoformat().replace('+00:00', 'Z')
+
+    events = [Event(**item) for item in scan_all(db.events_table)]
+    active_event_ids = {event.eventId for event in events if event.status == 'active'}
+    registered_at = (
+        item['registeredAt']
+        for item in scan_all(
+            db.registrations_table,
+            FilterExpression='#status = :registered AND registeredAt >= :since',
+            ProjectionExpression='eventId, registeredAt',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':registered': 'registered', ':since': window_start}
+        )
+        if item['eventId'] in active_event_ids
+    )
+
+    totals = db.stats.rebuild(events, registered_at, now=now)
+    print("Rebuilt stats: " + ", ".join(f"{k}={v}" for k, v in totals.items()))
+
+
+if __name__ == '__main__':
+    main()
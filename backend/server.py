@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Production server for running the API outside Lambda.
+
+Runs the app under gunicorn with preloaded uvicorn workers on uvloop and
+httptools. Configuration comes from the environment:
+
+- ``PORT`` - listen port (default 8000)
+- ``WEB_CONCURRENCY`` - worker processes (default one per CPU core)
+- ``KEEPALIVE`` - seconds an idle keep-alive connection is held open (default 5)
+- ``BACKLOG`` - pending connection queue length (default 2048)
+- ``GRACEFUL_TIMEOUT`` - seconds workers get to finish in-flight requests on shutdown (default 30)
+- ``TIMEOUT`` - seconds before a silent worker is killed and restarted (default 60)
+- ``MAX_REQUESTS`` - recycle a worker after this many requests, 0 disables (default 0)
+- ``DYNAMODB_MAX_POOL_CONNECTIONS`` - DynamoDB connection pool size per worker (default 40)
+- ``DYNAMODB_WARM_CONNECTIONS`` - connections opened per worker before it serves traffic (default 4)
+"""
+
+import os
+import warnings
+
+from gunicorn.app.base import BaseApplication
+
+with warnings.catch_warnings():
+    # uvicorn 0.32 deprecates uvicorn.workers in favour of the uvicorn-worker package
+    warnings.simplefilter('ignore', DeprecationWarning)
+    from uvicorn.workers import UvicornWorker
+
+# Sync route handlers run on a 40-thread pool, so size the pool to match
+os.environ.setdefault('DYNAMODB_MAX_POOL_CONNECTIONS', '40')
+
+
+class ProductionWorker(UvicornWorker):
+    CONFIG_KWARGS = {'loop': 'uvloop', 'http': 'httptools'}
+
+
+def post_fork(server, worker):
+    # The app is imported once in the arbiter; the boto3 connection pool and the
+    # log writer thread do not survive fork, so every worker rebuilds its own
+    import main
+    from database import DynamoDBClient
+    from logging_config import configure_logging
+
+    main.log_sampler = configure_logging()
+    main.db = DynamoDBClient()
+    main.db.warm_up(int(os.getenv('DYNAMODB_WARM_CONNECTIONS', '4')))
+
+
+def worker_exit(server, worker):
+    from logging_config import shutdown_logging
+    shutdown_logging()
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from main import app
+        return app
+
+
+def server_options() -> dict:
+    return {
+        'bind': f"0.0.0.0:{os.getenv('PORT', '8000')}",
+        'workers': int(os.getenv('WEB_CONCURRENCY', os.cpu_count() or 1)),
+        'worker_class': ProductionWorker,
+        'preload_app': True,
+        'keepalive': int(os.getenv('KEEPALIVE', '5')),
+        'backlog': int(os.getenv('BACKLOG', '2048')),
+        'graceful_timeout': int(os.getenv('GRACEFUL_TIMEOUT', '30')),
+        'timeout': int(os.getenv('TIMEOUT', '60')),
+        'max_requests': int(os.getenv('MAX_REQUESTS', '0')),
+        'max_requests_jitter': int(os.getenv('MAX_REQUESTS', '0')) // 10,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+    }
+
+
+if __name__ == '__main__':
+    Server(server_options()).run()
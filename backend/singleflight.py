@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.async_waiters = []
+        self.shared = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is in flight wait for it and receive the same result (or exception) instead
+    of issuing their own request. Nothing is cached: once the call completes,
+    the next caller starts a fresh one. Sync callers block on the result; async
+    callers await it without holding a thread.
+
+    Shared results are the same object for every caller, so they must not be
+    mutated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._requests = 0
+        self._executions = 0
+        self._coalesced = 0
+        self._max_shared = 0
+
+    def _join(self, key: Hashable):
+        with self._lock:
+            self._requests += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.shared += 1
+                self._coalesced += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self._executions += 1
+            return call, True
+
+    def _finish(self, key: Hashable, call: _Call, result: Any, error: Optional[BaseException]):
+        with self._lock:
+            del self._calls[key]
+            self._max_shared = max(self._max_shared, call.shared)
+            call.result = result
+            call.error = error
+            call.done.set()
+            waiters = call.async_waiters
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future, result, error)
+
+    def _run(self, key: Hashable, call: _Call, fn: Callable[[], Any]) -> Any:
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, call, None, e)
+            raise
+        self._finish(key, call, result, None)
+        return result
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        call, leader = self._join(key)
+        if leader:
+            return self._run(key, call, fn)
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Like do(), for callers on an event loop; `fn` runs in the default executor."""
+        call, leader = self._join(key)
+        loop = asyncio.get_running_loop()
+        if leader:
+            return await loop.run_in_executor(None, self._run, key, call, fn)
+
+        future = loop.create_future()
+        with self._lock:
+            finished = call.done.is_set()
+            if not finished:
+                call.async_waiters.append((loop, future))
+        if finished:
+            _resolve(future, call.result, call.error)
+        return await future
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'executions': self._executions,
+                'coalesced': self._coalesced,
+                'inFlight': len(self._calls),
+                'maxShared': self._max_shared,
+                'fanOutReduction': self._requests / self._executions if self._executions else 1.0,
+            }
+
+
+def _resolve(future: asyncio.Future, result: Any, error: Optional[BaseException]):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
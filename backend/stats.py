@@ -0,0 +1,177 @@
+from botocore.exceptions import BotoCoreError, ClientError
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+import logging
+import os
+import random
+
+from models import Event, OccupancyStats
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = 'global'
+FILL_BUCKET_PREFIX = 'fill#'
+FILL_WINDOW_HOURS = 24
+COUNTERS = ('activeEvents', 'capacity', 'registered', 'waitlisted')
+STATS_SHARDS = int(os.getenv('STATS_SHARDS', '10'))
+BATCH_GET_MAX_KEYS = 100
+
+
+def fill_bucket_key(at: datetime) -> str:
+    return FILL_BUCKET_PREFIX + at.strftime('%Y-%m-%dT%H')
+
+
+def shard_keys(stat_id: str, shards: int) -> List[str]:
+    """The unsharded item (written by rebuilds and before sharding) plus its shards."""
+    return [stat_id] + [f'{stat_id}#{shard}' for shard in range(shards)]
+
+
+def event_contribution(event: Optional[Event]) -> Dict[str, int]:
+    """Counters an event adds to the aggregates; only active events count."""
+    if event is None or event.status != 'active':
+        return dict.fromkeys(COUNTERS, 0)
+    return {
+        'activeEvents': 1,
+        'capacity': event.capacity,
+        'registered': event.registeredCount,
+        'waitlisted': event.waitlistCount,
+    }
+
+
+class StatsStore:
+    """Occupancy aggregates kept in the Stats table.
+
+    The ``global`` item holds running totals over active events. ``fill#<hour>``
+    items count net seats filled in each hour and expire after a few days.
+    Both are updated with atomic ADDs as events and registrations change, by
+    DynamoDBClient or by the Events table stream handler (``STATS_UPDATES``), so
+    reading the stats never touches the Events or Registrations tables.
+
+    Every registration updates the same two counters, so each ADD goes to one
+    of ``shards`` items (``global#<n>``, ``fill#<hour>#<n>``) picked at random,
+    keeping any single item under DynamoDB's per-item write limit during an
+    on-sale. Reads sum the shards; their cost depends on the shard count, not
+    on the number of events.
+    """
+
+    def __init__(self, dynamodb, table_name: str, shards: int = STATS_SHARDS):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.table = dynamodb.Table(table_name)
+        self.shards = shards
+
+    def apply(self, deltas: Dict[str, int]):
+        deltas = {k: v for k, v in deltas.items() if v}
+        if not deltas:
+            return
+        self._add(self._shard(GLOBAL_KEY), deltas)
+
+    def apply_event_change(self, old: Optional[Event], new: Optional[Event]):
+        before = event_contribution(old)
+        after = event_contribution(new)
+        self.apply({k: after[k] - before[k] for k in COUNTERS})
+
+    def apply_stream_change(self, old: Optional[Event], new: Optional[Event], at: Optional[datetime] = None):
+        """Apply one Events table stream record: the event's old and new images."""
+        self.apply_event_change(old, new)
+        if old is not None and new is not None and new.status == 'active':
+            filled = new.registeredCount - old.registeredCount
+            if filled:
+                self.record_fill(filled, at)
+
+    def record_fill(self, amount: int, at: Optional[datetime] = None):
+        at = at or datetime.now(timezone.utc)
+        expires_at = int((at + timedelta(days=3)).timestamp())
+        self._add(self._shard(fill_bucket_key(at)), {'registered': amount}, expires_at)
+
+    def _shard(self, stat_id: str) -> str:
+        return f'{stat_id}#{random.randrange(self.shards)}'
+
+    def _add(self, stat_id: str, deltas: Dict[str, int], expires_at: Optional[int] = None):
+        update_expression = 'ADD ' + ', '.join(f'#{k} :{k}' for k in deltas)
+        names = {f'#{k}': k for k in deltas}
+        values = {f':{k}': v for k, v in deltas.items()}
+        if expires_at is not None:
+            update_expression += ' SET expiresAt = :expiresAt'
+            values[':expiresAt'] = expires_at
+        try:
+            self.table.update_item(
+                Key={'statId': stat_id},
+                UpdateExpression=update_expression,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values
+            )
+        except (BotoCoreError, ClientError) as e:
+            # Stats drift is repaired by rebuild_stats.py; never fail the request over it
+            logger.error("Error updating stats item %s: %s", stat_id, e)
+
+    def read(self, now: Optional[datetime] = None) -> OccupancyStats:
+        now = now or datetime.now(timezone.utc)
+        bucket_keys = [fill_bucket_key(now - timedelta(hours=h)) for h in range(FILL_WINDOW_HOURS)]
+        keys = [
+            key
+            for stat_id in [GLOBAL_KEY] + bucket_keys
+            for key in shard_keys(stat_id, self.shards)
+        ]
+
+        items = {}
+        for start in range(0, len(keys), BATCH_GET_MAX_KEYS):
+            request_items = {self.table_name: {
+                'Keys': [{'statId': key} for key in keys[start:start + BATCH_GET_MAX_KEYS]]
+            }}
+            while request_items:
+                response = self.dynamodb.batch_get_item(RequestItems=request_items)
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    items[item['statId']] = item
+                request_items = response.get('UnprocessedKeys')
+
+        def total(stat_id: str, counter: str) -> int:
+            return sum(int(items.get(key, {}).get(counter, 0)) for key in shard_keys(stat_id, self.shards))
+
+        totals = {k: total(GLOBAL_KEY, k) for k in COUNTERS}
+        fills = [total(key, 'registered') for key in bucket_keys]
+
+        return OccupancyStats(
+            activeEvents=totals['activeEvents'],
+            totalCapacity=totals['capacity'],
+            registeredCount=totals['registered'],
+            waitlistCount=totals['waitlisted'],
+            occupancyRate=totals['registered'] / totals['capacity'] if totals['capacity'] else 0.0,
+            averageWaitlistDepth=totals['waitlisted'] / totals['activeEvents'] if totals['activeEvents'] else 0.0,
+            fillVelocityLastHour=fills[0],
+            fillVelocity24h=sum(fills) / FILL_WINDOW_HOURS
+        )
+
+    def rebuild(self, events: Iterable[Event], registered_at: Iterable[str], now: Optional[datetime] = None):
+        """Overwrite the aggregates from a full pass over events and registrations.
+
+        `registered_at` yields the registeredAt timestamps of registered seats,
+        which are bucketed by hour to rebuild the fill window. That only
+        approximates the incremental counts; see OccupancyStats.
+        """
+        now = now or datetime.now(timezone.utc)
+        totals = dict.fromkeys(COUNTERS, 0)
+        for event in events:
+            for k, v in event_contribution(event).items():
+                totals[k] += v
+
+        window_start = now - timedelta(hours=FILL_WINDOW_HOURS)
+        buckets = {fill_bucket_key(now - timedelta(hours=h)): 0 for h in range(FILL_WINDOW_HOURS)}
+        for timestamp in registered_at:
+            at = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            if at.tzinfo is None:
+                at = at.replace(tzinfo=timezone.utc)
+            key = fill_bucket_key(at)
+            if at > window_start and key in buckets:
+                buckets[key] += 1
+
+        expires_at = int((now + timedelta(days=3)).timestamp())
+        with self.table.batch_writer() as batch:
+            batch.put_item(Item={'statId': GLOBAL_KEY, **totals})
+            for key, count in buckets.items():
+                batch.put_item(Item={'statId': key, 'registered': count, 'expiresAt': expires_at})
+            # The totals now live in the unsharded items
+            for stat_id in [GLOBAL_KEY] + list(buckets):
+                for key in shard_keys(stat_id, self.shards)[1:]:
+                    batch.delete_item(Key={'statId': key})
+        return totals
@@ -0,0 +1,52 @@
+"""Lambda handler for the Events table stream.
+
+Keeps the Stats aggregates up to date from each event's old and new images
+(the API function sets STATS_UPDATES=stream), and when an event's date or
+title changes, copies them onto all of its registrations (see
+DynamoDBClient.update_registration_event_fields). The API function sets
+EVENT_FIELDS_FANOUT=stream so PUT /events/{event_id} returns without waiting
+for this.
+
+Stats are ADDs, so a record must not be applied twice. A record whose
+registrations could not be refreshed is reported as the batch's failure
+before its stats are applied, and the stream retries from that record only;
+the registration updates are idempotent.
+"""
+
+import logging
+from datetime import datetime, timezone
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from database import DynamoDBClient
+from logging_config import configure_logging
+from models import Event
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+db = DynamoDBClient()
+deserializer = TypeDeserializer()
+
+
+def _event(record: dict, name: str):
+    image = record['dynamodb'].get(name)
+    if not image:
+        return None
+    return Event(**{k: deserializer.deserialize(v) for k, v in image.items()})
+
+
+def handler(event, context):
+    for record in event.get('Records', []):
+        old, new = _event(record, 'OldImage'), _event(record, 'NewImage')
+        if old is not None and new is not None and (old.date != new.date or old.title != new.title):
+            logger.info("Refreshing registrations of event %s", new.eventId)
+            try:
+                db.update_registration_event_fields(new)
+            except Exception as e:
+                logger.error("Error refreshing registrations of event %s: %s", new.eventId, e)
+                return {'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]}
+        created = record['dynamodb'].get('ApproximateCreationDateTime')
+        at = datetime.fromtimestamp(float(created), tz=timezone.utc) if created else None
+        db.stats.apply_stream_change(old, new, at)
+    return {'batchItemFailures': []}
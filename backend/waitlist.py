@@ -0,0 +1,168 @@
+from botocore.exceptions import BotoCoreError, ClientError
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_ID = 'summary'
+BUCKET_SIZE = 1000
+TRANSACTION_MAX_ITEMS = 100
+
+
+def bucket_of(seq: int) -> int:
+    return seq // BUCKET_SIZE
+
+
+def bucket_id(bucket: int) -> str:
+    return f'bucket#{bucket:09d}'
+
+
+def _condition_failed(error: ClientError) -> bool:
+    reasons = error.response.get('CancellationReasons', [])
+    return any(reason.get('Code') == 'ConditionalCheckFailed' for reason in reasons)
+
+
+def rank_of(seq: int, removed_per_bucket: Dict[int, int], removed_in_bucket) -> int:
+    """1-based waitlist position of the entry with sequence number `seq`.
+
+    Entries get consecutive sequence numbers starting at 1, so the position is
+    `seq` minus the number of entries ahead of it that have since left the
+    waitlist: whole earlier buckets come from the summary counters, and the
+    entry's own bucket from its set of removed sequence numbers.
+    """
+    bucket = bucket_of(seq)
+    removed_ahead = sum(count for b, count in removed_per_bucket.items() if b < bucket)
+    removed_ahead += sum(1 for removed in removed_in_bucket if removed < seq)
+    return seq - removed_ahead
+
+
+class WaitlistCounters:
+    """Per-event waitlist ordering kept in the Waitlists table.
+
+    The ``summary`` item holds the last sequence number handed out and a map of
+    how many entries have left each bucket of BUCKET_SIZE sequence numbers.
+    ``bucket#<n>`` items hold the removed sequence numbers of one bucket.
+    Ranking an entry reads two small items however long the waitlist is.
+    """
+
+    def __init__(self, dynamodb, table_name: str):
+        self.table = dynamodb.Table(table_name)
+
+    def allocate(self, event_id: str) -> Tuple[int, int]:
+        """Hand out the next sequence number; returns it with its waitlist position.
+
+        An atomic ADD, so concurrent joins never contend. A number whose
+        registration is not written must be passed to record_removal, which
+        keeps later positions exact.
+        """
+        response = self.table.update_item(
+            Key={'eventId': event_id, 'counterId': SUMMARY_ID},
+            UpdateExpression='SET removed = if_not_exists(removed, :empty) ADD lastSeq :one',
+            ExpressionAttributeValues={':empty': {}, ':one': 1},
+            ReturnValues='ALL_NEW'
+        )
+        summary = response['Attributes']
+        seq = int(summary['lastSeq'])
+        # Nobody is behind a new entry, so every removal so far was ahead of it
+        removed_total = sum(int(count) for count in summary['removed'].values())
+        return seq, seq - removed_total
+
+    def record_removal(self, event_id: str, seq: int):
+        try:
+            self._record_bucket_removals(event_id, {bucket_of(seq): {seq}}, guard=True)
+        except ClientError as e:
+            # Already recorded: the guard on the bucket item cancelled the transaction
+            if e.response['Error']['Code'] != 'TransactionCanceledException' or not _condition_failed(e):
+                logger.error("Error recording waitlist removal %s for event %s: %s", seq, event_id, e)
+        except BotoCoreError as e:
+            logger.error("Error recording waitlist removal %s for event %s: %s", seq, event_id, e)
+
+    def record_removals(self, event_id: str, seqs: List[int]):
+        """Record many removals with one write per bucket plus summary updates.
+
+        Unlike record_removal this does not guard against recording a sequence
+        number twice; callers must know each entry left exactly once, as
+        promotion transactions guarantee.
+        """
+        by_bucket: Dict[int, Set[int]] = {}
+        for seq in seqs:
+            by_bucket.setdefault(bucket_of(seq), set()).add(seq)
+        buckets = sorted(by_bucket)
+        # One summary update per transaction leaves room for this many bucket updates
+        per_transaction = TRANSACTION_MAX_ITEMS - 1
+        for start in range(0, len(buckets), per_transaction):
+            group = {b: by_bucket[b] for b in buckets[start:start + per_transaction]}
+            try:
+                self._record_bucket_removals(event_id, group, guard=False)
+            except (BotoCoreError, ClientError) as e:
+                logger.error("Error recording %s waitlist removals for event %s: %s",
+                             sum(len(s) for s in group.values()), event_id, e)
+
+    def _record_bucket_removals(self, event_id: str, by_bucket: Dict[int, Set[int]], guard: bool):
+        """Add removed sequence numbers to their buckets and the summary counts atomically.
+
+        Separate writes could leave a bucket listing a removal the summary does
+        not count, which skews the rank of every later bucket for good.
+        """
+        actions = []
+        for bucket, bucket_seqs in by_bucket.items():
+            action = {
+                'TableName': self.table.name,
+                'Key': {'eventId': event_id, 'counterId': bucket_id(bucket)},
+                'UpdateExpression': 'ADD removedSeqs :seqs',
+                'ExpressionAttributeValues': {':seqs': bucket_seqs}
+            }
+            if guard:
+                (seq,) = bucket_seqs
+                action['ConditionExpression'] = 'attribute_not_exists(removedSeqs) OR NOT contains(removedSeqs, :seq)'
+                action['ExpressionAttributeValues'][':seq'] = seq
+            actions.append({'Update': action})
+
+        names = {f'#b{bucket}': str(bucket) for bucket in by_bucket}
+        values = {f':n{bucket}': len(bucket_seqs) for bucket, bucket_seqs in by_bucket.items()}
+        values[':zero'] = 0
+        actions.append({'Update': {
+            'TableName': self.table.name,
+            'Key': {'eventId': event_id, 'counterId': SUMMARY_ID},
+            'UpdateExpression': 'SET ' + ', '.join(
+                f'removed.#b{bucket} = if_not_exists(removed.#b{bucket}, :zero) + :n{bucket}' for bucket in by_bucket
+            ),
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values
+        }})
+        # The resource's client serializes plain Python values, as the Table methods do
+        self.table.meta.client.transact_write_items(TransactItems=actions)
+
+    def rank(self, event_id: str, seq: int) -> Optional[Tuple[int, int]]:
+        """Return (position, waitlist size) for `seq`, or None if the event has no counters."""
+        summary = self.table.get_item(
+            Key={'eventId': event_id, 'counterId': SUMMARY_ID},
+            ConsistentRead=True
+        ).get('Item')
+        if summary is None:
+            return None
+        bucket = self.table.get_item(
+            Key={'eventId': event_id, 'counterId': bucket_id(bucket_of(seq))},
+            ConsistentRead=True
+        ).get('Item', {})
+
+        removed_per_bucket = {int(b): int(count) for b, count in summary['removed'].items()}
+        removed_in_bucket = [int(s) for s in bucket.get('removedSeqs', set())]
+        size = int(summary['lastSeq']) - sum(removed_per_bucket.values())
+        return rank_of(seq, removed_per_bucket, removed_in_bucket), size
+
+    def delete_event(self, event_id: str):
+        """Drop every counter item of an event that no longer has a waitlist."""
+        kwargs = {
+            'KeyConditionExpression': 'eventId = :eid',
+            'ProjectionExpression': 'eventId, counterId',
+            'ExpressionAttributeValues': {':eid': event_id}
+        }
+        with self.table.batch_writer() as batch:
+            while True:
+                response = self.table.query(**kwargs)
+                for item in response.get('Items', []):
+                    batch.delete_item(Key={'eventId': item['eventId'], 'counterId': item['counterId']})
+                if 'LastEvaluatedKey' not in response:
+                    return
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
@@ -0,0 +1,56 @@
+import logging
+import os
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Minimal API Gateway REST proxy event, pushed through the ASGI stack to build
+# Starlette's middleware stack and Mangum's adapters before real traffic arrives
+PRIME_EVENT = {
+    "resource": "/health",
+    "path": "/health",
+    "httpMethod": "GET",
+    "headers": {"Host": "warmup.local"},
+    "multiValueHeaders": {},
+    "queryStringParameters": None,
+    "multiValueQueryStringParameters": None,
+    "pathParameters": None,
+    "stageVariables": None,
+    "requestContext": {
+        "resourcePath": "/health",
+        "httpMethod": "GET",
+        "path": "/health",
+        "stage": "warmup",
+        "identity": {"sourceIp": "127.0.0.1"}
+    },
+    "body": None,
+    "isBase64Encoded": False
+}
+
+
+def is_warmup_event(event) -> bool:
+    """Scheduled EventBridge pings and warmer plugin invocations, not API requests."""
+    if not isinstance(event, dict):
+        return False
+    if event.get("source") == "aws.events" and event.get("detail-type") == "Scheduled Event":
+        return True
+    if event.get("source") == "serverless-plugin-warmup":
+        return True
+    return event.get("warmup") is True
+
+
+def prime_on_init_enabled() -> bool:
+    default = 'true' if os.getenv('AWS_LAMBDA_FUNCTION_NAME') else 'false'
+    return os.getenv('LAMBDA_PRIME_ON_INIT', default).lower() == 'true'
+
+
+def prime_container(db, asgi_handler: Callable):
+    """Open DynamoDB connections and run one synthetic request through the app."""
+    started = time.perf_counter()
+    db.warm_up(int(os.getenv('LAMBDA_WARM_CONNECTIONS', '2')))
+    try:
+        asgi_handler(PRIME_EVENT, None)
+    except Exception as e:
+        logger.warning("Priming the ASGI stack failed: %s", e)
+    logger.info("Container primed in %.1f ms", (time.perf_counter() - started) * 1000)
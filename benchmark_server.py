@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Compare throughput of single-process uvicorn against the multi-worker server.
+
+Starts each server locally from backend/, drives it with keep-alive HTTP
+clients running in separate processes, and prints requests per second.
+
+    python benchmark_server.py --workers 4 --clients 8 --duration 10
+    python benchmark_server.py --path /events   # needs DynamoDB credentials and tables
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+
+def wait_until_ready(port: int, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def client_worker(port: int, path: str, duration: float, results):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    completed = errors = 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status < 500:
+                completed += 1
+            else:
+                errors += 1
+        except OSError:
+            errors += 1
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+    results.put((completed, errors))
+
+
+def run_load(port: int, path: str, clients: int, duration: float):
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=client_worker, args=(port, path, duration, results))
+        for _ in range(clients)
+    ]
+    for proc in procs:
+        proc.start()
+    totals = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    completed = sum(c for c, _ in totals)
+    errors = sum(e for _, e in totals)
+    return completed / duration, errors
+
+
+def benchmark(name: str, command: list, env: dict, port: int, args) -> float:
+    proc = subprocess.Popen(
+        command, cwd=BACKEND_DIR, env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(port)
+        run_load(port, args.path, args.clients, 1.0)  # warm-up
+        rps, errors = run_load(port, args.path, args.clients, args.duration)
+        print(f"{name:<30} {rps:>10.0f} req/s  ({errors} errors)")
+        return rps
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent client processes")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per run")
+    parser.add_argument('--path', default='/health')
+    parser.add_argument('--port', type=int, default=8123)
+    args = parser.parse_args()
+
+    env = {'LOG_SAMPLE_DEFAULT_RATE': '0', 'AWS_DEFAULT_REGION': os.getenv('AWS_DEFAULT_REGION', 'us-west-2')}
+    print(f"GET {args.path}, {args.clients} clients, {args.duration:.0f}s per run")
+
+    baseline = benchmark(
+        "uvicorn (1 worker)",
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(args.port), '--log-level', 'warning'],
+        env, args.port, args
+    )
+    tuned = benchmark(
+        f"server.py ({args.workers} workers)",
+        [sys.executable, 'server.py'],
+        {**env, 'PORT': str(args.port), 'WEB_CONCURRENCY': str(args.workers), 'DYNAMODB_WARM_CONNECTIONS': '0'},
+        args.port, args
+    )
+    if baseline:
+        print(f"Speedup: {tuned / baseline:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,11 +6,17 @@ set -e
 echo "Installing CDK dependencies..."
 python3 -m pip install --user aws-cdk-lib constructs
 
+# PERFORMANCE_PROFILE=cost ./deploy.sh; the package is built for the profile's architecture
+PERFORMANCE_PROFILE="${PERFORMANCE_PROFILE:-default}"
+
+echo "Packaging Lambda function for the $PERFORMANCE_PROFILE profile..."
+PERFORMANCE_PROFILE="$PERFORMANCE_PROFILE" ./package_lambda.sh
+
 echo "Synthesizing CDK stack..."
-python3 app.py
+cdk synth -c performanceProfile="$PERFORMANCE_PROFILE" > /dev/null
 
 echo "Deploying with CDK..."
 cdk bootstrap --no-verify-ssl
-cdk deploy --no-verify-ssl --require-approval never
+cdk deploy -c performanceProfile="$PERFORMANCE_PROFILE" --no-verify-ssl --require-approval never
 
 echo "Deployment complete!"
@@ -18,13 +18,26 @@ mkdir -p "$PACKAGE_DIR"
 echo "Copying backend code..."
 cp "$BACKEND_DIR"/*.py "$PACKAGE_DIR/"
 
-# Install dependencies
-echo "Installing dependencies..."
-pip3 install -r "$BACKEND_DIR/requirements.txt" -t "$PACKAGE_DIR/" --platform manylinux2014_x86_64 --only-binary=:all: --python-version 3.11
+# Install dependencies for the architecture of the performance profile that will be
+# deployed (PERFORMANCE_PROFILE=cost ./package_lambda.sh, then cdk deploy -c performanceProfile=cost)
+PERFORMANCE_PROFILE="${PERFORMANCE_PROFILE:-default}"
+LAMBDA_ARCHITECTURE=$(cd "$SCRIPT_DIR" && python3 -c \
+    "import sys; from stacks.performance_profiles import get_performance_profile; print(get_performance_profile(sys.argv[1]).architecture)" \
+    "$PERFORMANCE_PROFILE")
+if [ "$LAMBDA_ARCHITECTURE" = "arm64" ]; then
+    PLATFORM=manylinux2014_aarch64
+else
+    PLATFORM=manylinux2014_x86_64
+fi
+echo "Installing dependencies for $PLATFORM..."
+pip3 install -r "$BACKEND_DIR/requirements.txt" -t "$PACKAGE_DIR/" --platform "$PLATFORM" --only-binary=:all: --python-version 3.11
 
 # Remove unnecessary files to reduce size
 echo "Cleaning up..."
 cd "$PACKAGE_DIR"
 rm -rf boto3* botocore* pip* setuptools* wheel* *.dist-info __pycache__
 
+# BackendStack refuses to deploy the package to a function of another architecture
+echo "$LAMBDA_ARCHITECTURE" > "$PACKAGE_DIR/.architecture"
+
 echo "Package created in $PACKAGE_DIR/"
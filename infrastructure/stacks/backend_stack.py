@@ -1,7 +1,10 @@
+import os
+
 from aws_cdk import (
     Stack,
     aws_dynamodb as dynamodb,
     aws_lambda as lambda_,
+    aws_lambda_event_sources as lambda_event_sources,
     aws_apigateway as apigateway,
     RemovalPolicy,
     CfnOutput,
@@ -9,11 +12,21 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+from .performance_profiles import check_package_architecture, get_performance_profile
+
 
 class BackendStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
+        # cdk deploy -c performanceProfile=default|cost|latency
+        profile = get_performance_profile(self.node.try_get_context("performanceProfile"))
+        lambda_package_dir = (
+            self.node.try_get_context("lambdaPackageDir")
+            or os.path.join(os.path.dirname(__file__), "../lambda_package")
+        )
+        check_package_architecture(lambda_package_dir, profile)
+
         # DynamoDB Tables
         events_table = dynamodb.Table(
             self, "EventsTable",
@@ -23,6 +36,9 @@ class BackendStack(Stack):
                 type=dynamodb.AttributeType.STRING
             ),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            # Feeds streams.py, which copies date/title changes onto registrations
+            # and updates the Stats counters
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
             removal_policy=RemovalPolicy.DESTROY
         )
 
@@ -48,6 +64,78 @@ class BackendStack(Stack):
             removal_policy=RemovalPolicy.DESTROY
         )
 
+        # Occupancy aggregates served by GET /stats
+        stats_table = dynamodb.Table(
+            self, "StatsTable",
+            table_name="Stats",
+            partition_key=dynamodb.Attribute(
+                name="statId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            time_to_live_attribute="expiresAt",
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # Waitlist sequence numbers and removal counters for live waitlist positions
+        waitlists_table = dynamodb.Table(
+            self, "WaitlistsTable",
+            table_name="Waitlists",
+            partition_key=dynamodb.Attribute(
+                name="eventId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="counterId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # Cold storage for events and registrations moved out by archive_events.py
+        archived_events_table = dynamodb.Table(
+            self, "ArchivedEventsTable",
+            table_name="ArchivedEvents",
+            partition_key=dynamodb.Attribute(
+                name="eventId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            table_class=dynamodb.TableClass.STANDARD_INFREQUENT_ACCESS,
+            removal_policy=RemovalPolicy.RETAIN
+        )
+
+        archived_registrations_table = dynamodb.Table(
+            self, "ArchivedRegistrationsTable",
+            table_name="ArchivedRegistrations",
+            partition_key=dynamodb.Attribute(
+                name="eventId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="userId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            table_class=dynamodb.TableClass.STANDARD_INFREQUENT_ACCESS,
+            removal_policy=RemovalPolicy.RETAIN
+        )
+
+        # A user's archived history, GET /users/{user_id}/registrations?includeArchived=true
+        archived_registrations_table.add_global_secondary_index(
+            index_name="userId-eventDate-index",
+            partition_key=dynamodb.Attribute(
+                name="userId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="eventDate",
+                type=dynamodb.AttributeType.STRING
+            ),
+            projection_type=dynamodb.ProjectionType.ALL
+        )
+
         # Add GSI for userId-eventId lookup
         registrations_table.add_global_secondary_index(
             index_name="userId-eventId-index",
@@ -76,33 +164,174 @@ class BackendStack(Stack):
             projection_type=dynamodb.ProjectionType.ALL
         )
 
+        # Add GSI for a user's registrations ordered by event date
+        registrations_table.add_global_secondary_index(
+            index_name="userId-eventDate-index",
+            partition_key=dynamodb.Attribute(
+                name="userId",
+                type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="eventDate",
+                type=dynamodb.AttributeType.STRING
+            ),
+            projection_type=dynamodb.ProjectionType.ALL
+        )
+
+        # Optional Registrations table keyed by eventId + userId
+        # (cdk deploy -c registrationsKeySchema=migrating|composite)
+        registrations_key_schema = self.node.try_get_context("registrationsKeySchema") or "legacy"
+        registrations_v2_table = None
+        if registrations_key_schema in ("migrating", "composite"):
+            registrations_v2_table = dynamodb.Table(
+                self, "RegistrationsV2Table",
+                table_name="RegistrationsV2",
+                partition_key=dynamodb.Attribute(
+                    name="eventId",
+                    type=dynamodb.AttributeType.STRING
+                ),
+                sort_key=dynamodb.Attribute(
+                    name="userId",
+                    type=dynamodb.AttributeType.STRING
+                ),
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                removal_policy=RemovalPolicy.DESTROY
+            )
+
+            # No userId-eventId-index: with eventId + userId as the table key,
+            # registrations are looked up with get_item
+            registrations_v2_table.add_global_secondary_index(
+                index_name="eventId-status-index",
+                partition_key=dynamodb.Attribute(
+                    name="eventId",
+                    type=dynamodb.AttributeType.STRING
+                ),
+                sort_key=dynamodb.Attribute(
+                    name="status",
+                    type=dynamodb.AttributeType.STRING
+                ),
+                projection_type=dynamodb.ProjectionType.ALL
+            )
+
+            # Add GSI for a user's registrations ordered by event date
+            registrations_v2_table.add_global_secondary_index(
+                index_name="userId-eventDate-index",
+                partition_key=dynamodb.Attribute(
+                    name="userId",
+                    type=dynamodb.AttributeType.STRING
+                ),
+                sort_key=dynamodb.Attribute(
+                    name="eventDate",
+                    type=dynamodb.AttributeType.STRING
+                ),
+                projection_type=dynamodb.ProjectionType.ALL
+            )
+
+        registrations_environment = {
+            "REGISTRATIONS_TABLE_NAME": registrations_table.table_name
+        }
+        if registrations_key_schema == "migrating":
+            # Dual-write into the new table while migrate_registrations.py backfills it
+            registrations_environment["REGISTRATIONS_MIRROR_TABLE_NAME"] = registrations_v2_table.table_name
+        elif registrations_key_schema == "composite":
+            # Keep the legacy table mirrored so a rollback loses nothing
+            registrations_environment = {
+                "REGISTRATIONS_TABLE_NAME": registrations_v2_table.table_name,
+                "REGISTRATIONS_KEY_SCHEMA": "composite",
+                "REGISTRATIONS_MIRROR_TABLE_NAME": registrations_table.table_name
+            }
+
         # Lambda Function
-        import os
-        lambda_package_dir = os.path.join(os.path.dirname(__file__), "../lambda_package")
-        
         api_lambda = lambda_.Function(
             self, "EventsApiLambda",
             runtime=lambda_.Runtime.PYTHON_3_11,
             handler="main.handler",
             code=lambda_.Code.from_asset(lambda_package_dir),
-            memory_size=512,
+            architecture=(
+                lambda_.Architecture.ARM_64 if profile.architecture == "arm64"
+                else lambda_.Architecture.X86_64
+            ),
+            memory_size=profile.memory_size,
+            reserved_concurrent_executions=profile.reserved_concurrency,
             timeout=Duration.seconds(30),
             environment={
                 "DYNAMODB_TABLE_NAME": events_table.table_name,
                 "USERS_TABLE_NAME": users_table.table_name,
-                "REGISTRATIONS_TABLE_NAME": registrations_table.table_name
+                "STATS_TABLE_NAME": stats_table.table_name,
+                "WAITLISTS_TABLE_NAME": waitlists_table.table_name,
+                "ARCHIVED_EVENTS_TABLE_NAME": archived_events_table.table_name,
+                "ARCHIVED_REGISTRATIONS_TABLE_NAME": archived_registrations_table.table_name,
+                "EVENT_FIELDS_FANOUT": "stream",
+                "STATS_UPDATES": "stream",
+                **registrations_environment
             }
         )
 
+        # Copies event date/title changes onto every registration, which can take
+        # longer than an API request may, and keeps the Stats counters off the
+        # request path
+        stream_lambda = lambda_.Function(
+            self, "EventsStreamLambda",
+            runtime=lambda_.Runtime.PYTHON_3_11,
+            handler="streams.handler",
+            code=lambda_.Code.from_asset(lambda_package_dir),
+            architecture=api_lambda.architecture,
+            memory_size=profile.memory_size,
+            timeout=Duration.minutes(5),
+            environment={
+                "DYNAMODB_TABLE_NAME": events_table.table_name,
+                "STATS_TABLE_NAME": stats_table.table_name,
+                "WAITLISTS_TABLE_NAME": waitlists_table.table_name,
+                **registrations_environment
+            }
+        )
+        stream_lambda.add_event_source(lambda_event_sources.DynamoEventSource(
+            events_table,
+            starting_position=lambda_.StartingPosition.LATEST,
+            batch_size=10,
+            bisect_batch_on_error=True,
+            retry_attempts=5,
+            # streams.handler reports the first record it could not process, so
+            # records whose stats were already added are not retried
+            report_batch_item_failures=True
+        ))
+        events_table.grant_read_data(stream_lambda)
+        stats_table.grant_read_write_data(stream_lambda)
+        registrations_table.grant_read_write_data(stream_lambda)
+
+        # API Gateway invokes the "live" alias, which keeps provisioned
+        # environments initialized and scales them with utilization
+        api_target = api_lambda
+        if profile.provisioned:
+            api_target = lambda_.Alias(
+                self, "EventsApiLiveAlias",
+                alias_name="live",
+                version=api_lambda.current_version,
+                provisioned_concurrent_executions=profile.provisioned_concurrency_min
+            )
+            scaling = api_target.add_auto_scaling(
+                min_capacity=profile.provisioned_concurrency_min,
+                max_capacity=profile.provisioned_concurrency_max
+            )
+            scaling.scale_on_utilization(utilization_target=profile.provisioned_utilization_target)
+
         # Grant Lambda permissions to access DynamoDB
         events_table.grant_read_write_data(api_lambda)
         users_table.grant_read_write_data(api_lambda)
+        stats_table.grant_read_write_data(api_lambda)
+        waitlists_table.grant_read_write_data(api_lambda)
+        # The API only reads the archive; archive_events.py writes it
+        archived_events_table.grant_read_data(api_lambda)
+        archived_registrations_table.grant_read_data(api_lambda)
         registrations_table.grant_read_write_data(api_lambda)
+        if registrations_v2_table is not None:
+            registrations_v2_table.grant_read_write_data(api_lambda)
+            registrations_v2_table.grant_read_write_data(stream_lambda)
 
         # API Gateway
         api = apigateway.LambdaRestApi(
             self, "EventsApi",
-            handler=api_lambda,
+            handler=api_target,
             proxy=True,
             default_cors_preflight_options=apigateway.CorsOptions(
                 allow_origins=apigateway.Cors.ALL_ORIGINS,
@@ -0,0 +1,88 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+# Written by package_lambda.sh with the architecture the wheels were installed for
+PACKAGE_ARCHITECTURE_FILE = ".architecture"
+
+
+@dataclass(frozen=True)
+class PerformanceProfile:
+    """Lambda sizing settings for BackendStack.
+
+    Selected with ``cdk deploy -c performanceProfile=<name>``.
+    """
+
+    architecture: str = "x86_64"
+    memory_size: int = 512
+    # Reserved concurrency caps the function and guarantees it that many executions
+    reserved_concurrency: Optional[int] = None
+    # Provisioned concurrency on the "live" alias, auto-scaled between min and max
+    provisioned_concurrency_min: Optional[int] = None
+    provisioned_concurrency_max: Optional[int] = None
+    provisioned_utilization_target: float = 0.7
+
+    def __post_init__(self):
+        if self.architecture not in ("x86_64", "arm64"):
+            raise ValueError(f"Unknown Lambda architecture: {self.architecture}")
+        if (self.provisioned_concurrency_min is None) != (self.provisioned_concurrency_max is None):
+            raise ValueError("Set both provisioned_concurrency_min and provisioned_concurrency_max")
+        if self.provisioned_concurrency_min is not None:
+            if not 0 < self.provisioned_concurrency_min <= self.provisioned_concurrency_max:
+                raise ValueError("Provisioned concurrency must satisfy 0 < min <= max")
+            if self.reserved_concurrency is not None and self.provisioned_concurrency_max > self.reserved_concurrency:
+                raise ValueError("Provisioned concurrency cannot exceed reserved concurrency")
+
+    @property
+    def provisioned(self) -> bool:
+        return self.provisioned_concurrency_min is not None
+
+
+PERFORMANCE_PROFILES = {
+    # What the stack has always deployed
+    "default": PerformanceProfile(),
+    # Graviton is ~20% cheaper per GB-second; 1 GB gets more CPU for JSON and
+    # pydantic work without paying for idle provisioned capacity
+    "cost": PerformanceProfile(
+        architecture="arm64",
+        memory_size=1024
+    ),
+    # No cold starts for the first 5-50 concurrent requests; 1769 MB is one full vCPU
+    "latency": PerformanceProfile(
+        architecture="arm64",
+        memory_size=1769,
+        reserved_concurrency=100,
+        provisioned_concurrency_min=5,
+        provisioned_concurrency_max=50
+    ),
+}
+
+
+def get_performance_profile(name: Optional[str]) -> PerformanceProfile:
+    name = name or "default"
+    if name not in PERFORMANCE_PROFILES:
+        raise ValueError(
+            f"Unknown performanceProfile '{name}', expected one of: {', '.join(PERFORMANCE_PROFILES)}"
+        )
+    return PERFORMANCE_PROFILES[name]
+
+
+def check_package_architecture(package_dir: str, profile: PerformanceProfile):
+    """Fail synth when the Lambda package holds wheels for another architecture.
+
+    An x86_64 pydantic_core does not import on an arm64 function. Packages built
+    before package_lambda.sh recorded the architecture are x86_64, its default.
+    """
+    if not os.path.exists(os.path.join(package_dir, "main.py")):
+        # Nothing packaged yet, e.g. synthesizing in tests
+        return
+    marker = os.path.join(package_dir, PACKAGE_ARCHITECTURE_FILE)
+    built = "x86_64"
+    if os.path.exists(marker):
+        with open(marker) as f:
+            built = f.read().strip()
+    if built != profile.architecture:
+        raise ValueError(
+            f"lambda_package was built for {built} but the performance profile deploys "
+            f"{profile.architecture}; rebuild it with PERFORMANCE_PROFILE=<name> ./package_lambda.sh"
+        )
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Synthesize BackendStack for every performance profile and check the template.
+
+Runs offline with aws-cdk-lib installed (pip install -r requirements.txt):
+
+    python test_backend_stack.py
+"""
+
+import os
+import sys
+import tempfile
+
+import aws_cdk as cdk
+from aws_cdk.assertions import Match, Template
+
+from stacks.backend_stack import BackendStack
+from stacks.performance_profiles import (
+    PACKAGE_ARCHITECTURE_FILE, PERFORMANCE_PROFILES, PerformanceProfile, check_package_architecture
+)
+
+# Code.from_asset needs the package directory to exist, not to be built; an empty
+# one also keeps a real lambda_package of any architecture out of the way
+EMPTY_PACKAGE_DIR = tempfile.mkdtemp()
+
+failures = 0
+
+
+def check(name, condition):
+    global failures
+    print(f"  {'✅ PASS' if condition else '❌ FAIL'}: {name}")
+    if not condition:
+        failures += 1
+
+
+def synth(context) -> Template:
+    app = cdk.App(context={"lambdaPackageDir": EMPTY_PACKAGE_DIR, **context})
+    return Template.from_stack(BackendStack(app, "BackendStack"))
+
+
+def api_function(template: Template) -> dict:
+    functions = template.find_resources("AWS::Lambda::Function", {
+        "Properties": {"Handler": "main.handler"}
+    })
+    assert len(functions) == 1, functions
+    return next(iter(functions.values()))["Properties"]
+
+
+def index_projections(template: Template, table_name: str) -> dict:
+    tables = template.find_resources("AWS::DynamoDB::Table", {"Properties": {"TableName": table_name}})
+    table = next(iter(tables.values()))["Properties"]
+    return {
+        index["IndexName"]: index["Projection"]["ProjectionType"]
+        for index in table["GlobalSecondaryIndexes"]
+    }
+
+
+def assert_provisioned(template: Template, profile: PerformanceProfile, alias_id: str):
+    template.has_resource_properties("AWS::Lambda::Alias", {
+        "Name": "live",
+        "ProvisionedConcurrencyConfig": {
+            "ProvisionedConcurrentExecutions": profile.provisioned_concurrency_min
+        }
+    })
+    template.has_resource_properties("AWS::ApplicationAutoScaling::ScalableTarget", {
+        "MinCapacity": profile.provisioned_concurrency_min,
+        "MaxCapacity": profile.provisioned_concurrency_max,
+        "ScalableDimension": "lambda:function:ProvisionedConcurrency"
+    })
+    template.has_resource_properties("AWS::ApplicationAutoScaling::ScalingPolicy", {
+        "TargetTrackingScalingPolicyConfiguration": {
+            "TargetValue": profile.provisioned_utilization_target,
+            "PredefinedMetricSpecification": {
+                "PredefinedMetricType": "LambdaProvisionedConcurrencyUtilization"
+            }
+        }
+    })
+    # API Gateway must invoke the alias, or provisioned environments sit idle
+    template.has_resource_properties("AWS::ApiGateway::Method", {
+        "Integration": {"Uri": {"Fn::Join": ["", Match.array_with([{"Ref": alias_id}])]}}
+    })
+
+
+def check_profile(name: str, profile: PerformanceProfile, key_schema: str):
+    print(f"Profile {name} (registrationsKeySchema={key_schema})")
+    template = synth({"performanceProfile": name, "registrationsKeySchema": key_schema})
+    function = api_function(template)
+
+    check("architecture", function.get("Architectures", ["x86_64"]) == [profile.architecture])
+    check("memory size", function["MemorySize"] == profile.memory_size)
+    check("reserved concurrency", function.get("ReservedConcurrentExecutions") == profile.reserved_concurrency)
+
+    aliases = template.find_resources("AWS::Lambda::Alias")
+    targets = template.find_resources("AWS::ApplicationAutoScaling::ScalableTarget")
+    if profile.provisioned:
+        try:
+            assert_provisioned(template, profile, next(iter(aliases)))
+            check("provisioned alias with auto-scaling", True)
+        except Exception as e:
+            print(f"    {e}")
+            check("provisioned alias with auto-scaling", False)
+    else:
+        check("no provisioned concurrency", not aliases and not targets)
+
+    check("Registrations projections", index_projections(template, "Registrations") == {
+        "userId-eventId-index": "ALL",
+        "eventId-status-index": "ALL",
+        "userId-eventDate-index": "ALL",
+    })
+    if key_schema != "legacy":
+        # Looked up by its eventId + userId key, so no userId-eventId-index
+        check("RegistrationsV2 projections", index_projections(template, "RegistrationsV2") == {
+            "eventId-status-index": "ALL",
+            "userId-eventDate-index": "ALL",
+        })
+
+
+for profile_name, profile in PERFORMANCE_PROFILES.items():
+    for key_schema in ("legacy", "migrating"):
+        check_profile(profile_name, profile, key_schema)
+    print()
+
+print("Default context")
+default = api_function(synth({}))
+check("no context deploys the default profile",
+      default["MemorySize"] == 512 and default.get("Architectures", ["x86_64"]) == ["x86_64"])
+print()
+
+print("Events stream")
+template = synth({})
+mappings = template.find_resources("AWS::Lambda::EventSourceMapping")
+check("stream handler reports batch item failures",
+      [m["Properties"].get("FunctionResponseTypes") for m in mappings.values()] == [["ReportBatchItemFailures"]])
+check("API leaves stats to the stream",
+      api_function(template)["Environment"]["Variables"].get("STATS_UPDATES") == "stream")
+print()
+
+print("Invalid profiles")
+try:
+    synth({"performanceProfile": "turbo"})
+    check("unknown profile name is rejected", False)
+except ValueError:
+    check("unknown profile name is rejected", True)
+try:
+    PerformanceProfile(reserved_concurrency=10, provisioned_concurrency_min=5, provisioned_concurrency_max=20)
+    check("provisioned above reserved is rejected", False)
+except ValueError:
+    check("provisioned above reserved is rejected", True)
+print()
+
+print("Package architecture")
+
+
+def package(architecture=None) -> str:
+    package_dir = tempfile.mkdtemp()
+    open(os.path.join(package_dir, "main.py"), "w").close()
+    if architecture is not None:
+        with open(os.path.join(package_dir, PACKAGE_ARCHITECTURE_FILE), "w") as f:
+            f.write(architecture + "\n")
+    return package_dir
+
+
+def package_accepted(package_dir: str, profile_name: str) -> bool:
+    try:
+        check_package_architecture(package_dir, PERFORMANCE_PROFILES[profile_name])
+        return True
+    except ValueError:
+        return False
+
+check("arm64 package deploys with the cost profile", package_accepted(package("arm64"), "cost"))
+check("x86_64 package is rejected by the cost profile", not package_accepted(package("x86_64"), "cost"))
+check("arm64 package is rejected by the default profile", not package_accepted(package("arm64"), "default"))
+check("unmarked package counts as x86_64",
+      package_accepted(package(), "default") and not package_accepted(package(), "latency"))
+try:
+    synth({"performanceProfile": "cost", "lambdaPackageDir": package("x86_64")})
+    check("synth fails on a mismatched package", False)
+except ValueError:
+    check("synth fails on a mismatched package", True)
+print()
+
+if failures:
+    print(f"{failures} check(s) failed")
+    sys.exit(1)
+print("All stack tests passed!")
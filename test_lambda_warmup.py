@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Measure first-request latency of the Lambda handler with and without priming.
+
+Each scenario runs in a fresh Python process, like a Lambda cold start: import
+main (the init phase), then time the first and second GET /events/{id} calls
+through the handler. Needs DynamoDB access, e.g. AWS credentials for the
+deployed tables or DynamoDB Local:
+
+    python test_lambda_warmup.py
+    python test_lambda_warmup.py --endpoint-url http://localhost:8000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+CHILD = r'''
+import json, sys, time
+sys.path.insert(0, 'backend')
+
+started = time.perf_counter()
+import main
+init_ms = (time.perf_counter() - started) * 1000
+
+def api_event(path):
+    return {
+        "resource": "/events/{event_id}", "path": path, "httpMethod": "GET",
+        "headers": {"Host": "localhost"}, "multiValueHeaders": {},
+        "queryStringParameters": None, "multiValueQueryStringParameters": None,
+        "pathParameters": None, "stageVariables": None,
+        "requestContext": {"resourcePath": "/events/{event_id}", "httpMethod": "GET", "path": path,
+                           "stage": "test", "identity": {"sourceIp": "127.0.0.1"}},
+        "body": None, "isBase64Encoded": False,
+    }
+
+timings = []
+for _ in range(2):
+    started = time.perf_counter()
+    response = main.handler(api_event("/events/" + sys.argv[1]), None)
+    timings.append((time.perf_counter() - started) * 1000)
+
+started = time.perf_counter()
+warm = main.handler({"source": "aws.events", "detail-type": "Scheduled Event"}, None)
+warmup_ms = (time.perf_counter() - started) * 1000
+
+print(json.dumps({"init": init_ms, "first": timings[0], "second": timings[1],
+                  "status": response["statusCode"], "warmup": warmup_ms, "warmed": warm == {"warmed": True}}))
+'''
+
+
+def run_scenario(prime: bool, event_id: str, env: dict) -> dict:
+    env = {**os.environ, **env, 'LAMBDA_PRIME_ON_INIT': 'true' if prime else 'false', 'LOG_LEVEL': 'WARNING'}
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, event_id],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--event-id', default='warmup-latency-probe')
+    parser.add_argument('--endpoint-url', help="DynamoDB endpoint, e.g. DynamoDB Local")
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    env = {}
+    if args.endpoint_url:
+        env['AWS_ENDPOINT_URL_DYNAMODB'] = args.endpoint_url
+
+    results = {}
+    for prime in (False, True):
+        runs = [run_scenario(prime, args.event_id, env) for _ in range(args.runs)]
+        results[prime] = {key: sum(r[key] for r in runs) / len(runs) for key in ('init', 'first', 'second')}
+        label = "primed" if prime else "unprimed"
+        print(f"{label:<9} init {results[prime]['init']:7.1f} ms   first request {results[prime]['first']:7.1f} ms"
+              f"   second request {results[prime]['second']:7.1f} ms")
+        assert all(r['warmed'] for r in runs), "warm-up event was not short-circuited"
+
+    print()
+    print(f"First request: {results[False]['first']:.1f} ms -> {results[True]['first']:.1f} ms")
+    print("✅ PASS" if results[True]['first'] < results[False]['first'] else "❌ FAIL: priming did not reduce first-request latency")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Test read coalescing locally: SingleFlight with sync, async and mixed callers,
+and the /metrics counters against an in-process DynamoDB from moto (pip install moto)"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, 'backend')
+
+from singleflight import SingleFlight
+
+CALLERS = 20
+
+failures = 0
+
+
+def check(name, condition):
+    global failures
+    print(f"  {'✅ PASS' if condition else '❌ FAIL'}: {name}")
+    if not condition:
+        failures += 1
+
+
+def gated(flight: SingleFlight, callers: int, result=None, error=None):
+    """A function that returns only once `callers` calls have joined the flight."""
+    executions = []
+
+    def fn():
+        executions.append(1)
+        deadline = time.monotonic() + 5
+        while flight.stats()['requests'] < callers and time.monotonic() < deadline:
+            time.sleep(0.001)
+        if error is not None:
+            raise error
+        return result
+
+    return fn, executions
+
+
+# Test 1: concurrent sync callers
+print("Test 1: concurrent threads share one execution")
+flight = SingleFlight()
+fn, executions = gated(flight, CALLERS, result={'value': 1})
+with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+    results = list(executor.map(lambda _: flight.do('k', fn), range(CALLERS)))
+check("executions == 1", len(executions) == 1)
+check("every caller got the same result", all(r is results[0] for r in results) and results[0] == {'value': 1})
+stats = flight.stats()
+check("stats count the coalesced calls",
+      (stats['requests'], stats['executions'], stats['coalesced'], stats['inFlight'], stats['maxShared'])
+      == (CALLERS, 1, CALLERS - 1, 0, CALLERS - 1))
+print()
+
+
+# Test 2: concurrent async callers
+print("Test 2: concurrent awaiters share one execution")
+
+
+async def await_all(flight, fn, count):
+    return await asyncio.gather(*[flight.do_async('k', fn) for _ in range(count)], return_exceptions=True)
+
+flight = SingleFlight()
+fn, executions = gated(flight, CALLERS, result='event')
+results = asyncio.run(await_all(flight, fn, CALLERS))
+check("executions == 1", len(executions) == 1)
+check("every awaiter got the result", results == ['event'] * CALLERS)
+print()
+
+
+# Test 3: sync and async callers of the same key
+print("Test 3: mixed threads and awaiters share one execution")
+flight = SingleFlight()
+fn, executions = gated(flight, CALLERS, result='mixed')
+thread_results = []
+threads = [threading.Thread(target=lambda: thread_results.append(flight.do('k', fn))) for _ in range(CALLERS // 2)]
+for thread in threads:
+    thread.start()
+async_results = asyncio.run(await_all(flight, fn, CALLERS - len(threads)))
+for thread in threads:
+    thread.join()
+check("executions == 1", len(executions) == 1)
+check("every caller got the result", thread_results + async_results == ['mixed'] * CALLERS)
+print()
+
+
+# Test 4: exceptions reach every caller
+print("Test 4: an exception is raised to every caller")
+flight = SingleFlight()
+error = ValueError('boom')
+fn, executions = gated(flight, CALLERS, error=error)
+
+
+def call_sync():
+    try:
+        flight.do('k', fn)
+    except ValueError as e:
+        return e
+
+threads_errors = []
+threads = [threading.Thread(target=lambda: threads_errors.append(call_sync())) for _ in range(CALLERS // 2)]
+for thread in threads:
+    thread.start()
+async_errors = asyncio.run(await_all(flight, fn, CALLERS - len(threads)))
+for thread in threads:
+    thread.join()
+check("executions == 1", len(executions) == 1)
+check("every caller got the exception", all(e is error for e in threads_errors + async_errors))
+check("the next call runs again", flight.do('k', lambda: 'fresh') == 'fresh')
+print()
+
+try:
+    from moto import mock_aws
+except ImportError:
+    print("moto is not installed, skipping the /metrics tests")
+    sys.exit(1 if failures else 0)
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+with mock_aws():
+    import boto3
+    boto3.client('dynamodb').create_table(
+        TableName='Events',
+        KeySchema=[{'AttributeName': 'eventId', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'eventId', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    boto3.resource('dynamodb').Table('Events').put_item(Item={
+        'eventId': 'e1', 'title': 't', 'description': 'd', 'date': '2030-01-01', 'location': 'l',
+        'capacity': 10, 'organizer': 'o', 'status': 'active', 'registeredCount': 0, 'waitlistCount': 0
+    })
+
+    from fastapi.testclient import TestClient
+    import main
+
+    client = TestClient(main.app)
+    db = main.db
+
+    # Test 5: concurrent event reads are coalesced and reported by /metrics
+    print("Test 5: /metrics reports coalesced event reads")
+    fetch = db._fetch_event
+    gate, fetches = gated(db.read_flights, CALLERS)
+
+    def gated_fetch(event_id):
+        gate()
+        return fetch(event_id)
+
+    db._fetch_event = gated_fetch
+    with ThreadPoolExecutor(max_workers=CALLERS) as executor:
+        events = list(executor.map(lambda _: db.get_event('e1'), range(CALLERS)))
+    db._fetch_event = fetch
+    check("executions == 1", len(fetches) == 1)
+    check("every caller got the event", all(event is not None and event.eventId == 'e1' for event in events))
+    metrics = client.get('/metrics').json()['readCoalescing']
+    check("metrics count requests and executions",
+          (metrics['requests'], metrics['executions'], metrics['coalesced']) == (CALLERS, 1, CALLERS - 1))
+    check("metrics report the fan-out reduction", metrics['fanOutReduction'] == CALLERS)
+    print()
+
+if failures:
+    print(f"{failures} check(s) failed")
+    sys.exit(1)
+print("All read coalescing tests passed!")
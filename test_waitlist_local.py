@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Test waitlists locally: rank_of, and allocate/removal/rank and batch promotion
+against an in-process DynamoDB from moto (pip install moto)"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, 'backend')
+
+from waitlist import BUCKET_SIZE, rank_of
+
+failures = 0
+
+
+def check(name, condition):
+    global failures
+    print(f"  {'✅ PASS' if condition else '❌ FAIL'}: {name}")
+    if not condition:
+        failures += 1
+
+
+# Test 1: rank_of against a brute-force count
+print("Test 1: rank_of matches counting the entries still ahead")
+removed = {3, 7, 999, 1000, 1500, 2001, 2002}
+removed_per_bucket = {}
+for seq in removed:
+    removed_per_bucket[seq // BUCKET_SIZE] = removed_per_bucket.get(seq // BUCKET_SIZE, 0) + 1
+for seq in (1, 4, 8, 998, 1001, 1499, 1501, 2003, 3500):
+    in_bucket = [r for r in removed if r // BUCKET_SIZE == seq // BUCKET_SIZE]
+    expected = sum(1 for s in range(1, seq + 1) if s not in removed)
+    check(f"seq {seq} -> {expected}", rank_of(seq, removed_per_bucket, in_bucket) == expected)
+print()
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    print("moto is not installed, skipping the DynamoDB tests")
+    sys.exit(1 if failures else 0)
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ['REGISTRATIONS_KEY_SCHEMA'] = 'composite'
+os.environ['REGISTRATIONS_TABLE_NAME'] = 'Registrations'
+os.environ.pop('REGISTRATIONS_MIRROR_TABLE_NAME', None)
+# moto's in-memory tables are not safe for concurrent transactions
+os.environ['PROMOTION_CONCURRENCY'] = '1'
+
+
+
+def create_table(client, name, keys, status_index=False):
+    kwargs = {}
+    attributes = set(keys)
+    if status_index:
+        attributes |= {'eventId', 'status'}
+        kwargs['GlobalSecondaryIndexes'] = [{
+            'IndexName': 'eventId-status-index',
+            'KeySchema': [{'AttributeName': 'eventId', 'KeyType': 'HASH'}, {'AttributeName': 'status', 'KeyType': 'RANGE'}],
+            'Projection': {'ProjectionType': 'ALL'}
+        }]
+    client.create_table(
+        TableName=name,
+        KeySchema=[{'AttributeName': k, 'KeyType': t} for k, t in zip(keys, ('HASH', 'RANGE'))],
+        AttributeDefinitions=[{'AttributeName': k, 'AttributeType': 'S'} for k in sorted(attributes)],
+        BillingMode='PAY_PER_REQUEST',
+        **kwargs
+    )
+
+
+with mock_aws():
+    client = boto3.client('dynamodb')
+    create_table(client, 'Waitlists', ('eventId', 'counterId'))
+    create_table(client, 'Registrations', ('eventId', 'userId'), status_index=True)
+    create_table(client, 'LegacyRegistrations', ('registrationId',), status_index=True)
+    create_table(client, 'Events', ('eventId',))
+    create_table(client, 'Stats', ('statId',))
+
+    from database import DuplicateRegistrationError, DynamoDBClient
+    from models import Registration
+
+    db = DynamoDBClient()
+
+    def join(user_id, event_id='e1', db=db):
+        return db.create_waitlisted_registration(Registration(
+            registrationId=f'r-{user_id}', userId=user_id, eventId=event_id,
+            status='waitlisted', registeredAt='2030-01-01T00:00:00Z'
+        ))
+
+    # Test 2: allocation hands out consecutive numbers and positions
+    print("Test 2: joins get consecutive sequence numbers")
+    entries = [join(f'u{i}') for i in range(1, 6)]
+    check("seqs 1-5", [e.waitlistSeq for e in entries] == [1, 2, 3, 4, 5])
+    check("positions 1-5", [e.waitlistPosition for e in entries] == [1, 2, 3, 4, 5])
+    print()
+
+    # Test 3: a failed registration write gives its number up as a removal
+    print("Test 3: duplicate join counts its number as removed")
+    try:
+        join('u3')
+        check("duplicate rejected", False)
+    except DuplicateRegistrationError:
+        check("duplicate rejected", True)
+    entry = join('u6')
+    check("next join gets seq 7, position 6", (entry.waitlistSeq, entry.waitlistPosition) == (7, 6))
+    check("u6 ranks 6 of 6", db.waitlist.rank('e1', 7) == (6, 6))
+    print()
+
+    # Test 4: concurrent joins all succeed with distinct numbers
+    print("Test 4: 20 concurrent joins")
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        entries = list(executor.map(join, [f'c{i}' for i in range(20)]))
+    check("every join got its own seq", sorted(e.waitlistSeq for e in entries) == list(range(8, 28)))
+    check("waitlist size is 26", db.waitlist.rank('e1', 27) == (26, 26))
+    print()
+
+    # Test 5: removals and ranks
+    print("Test 5: rank after removals")
+    db.waitlist.record_removal('e1', 2)
+    db.waitlist.record_removal('e1', 2)
+    check("u4 moves up to position 3 of 25", db.waitlist.rank('e1', 4) == (3, 25))
+    db.waitlist.record_removals('e1', [1, 3])
+    check("u4 at position 1 of 23", db.waitlist.rank('e1', 4) == (1, 23))
+    check("last join at position 23 of 23", db.waitlist.rank('e1', 27) == (23, 23))
+    summary = client.get_item(TableName='Waitlists', Key={'eventId': {'S': 'e1'}, 'counterId': {'S': 'summary'}})['Item']
+    check("summary counts each removal once", summary['removed']['M']['0']['N'] == '4')
+    print()
+
+    def put_event(event_id, capacity, registered, waitlisted):
+        db.events_table.put_item(Item={
+            'eventId': event_id, 'title': 't', 'description': 'd', 'date': '2030-01-01', 'location': 'l',
+            'capacity': capacity, 'hasWaitlist': True, 'organizer': 'o', 'status': 'active',
+            'registeredCount': registered, 'waitlistCount': waitlisted
+        })
+
+    def record_transactions(db):
+        """Sizes of the registration transactions, with the request ID they ran under."""
+        sizes = []
+
+        def record(params, **kwargs):
+            (action,) = params['TransactItems'][0].values()
+            if action['TableName'] == db.registrations_table_name:
+                sizes.append((len(params['TransactItems']), request_id_var.get()))
+        db.dynamodb.meta.client.meta.events.register('provide-client-params.dynamodb.TransactWriteItems', record)
+        return sizes
+
+    def count_calls(db, name):
+        calls = []
+        original = getattr(db, name)
+
+        def counted(*args, **kwargs):
+            calls.append(args)
+            return original(*args, **kwargs)
+        setattr(db, name, counted)
+        return calls
+
+    from fastapi.testclient import TestClient
+    from logging_config import request_id_var
+    import main
+
+    # Test 6: a capacity raise promotes in FIFO order, 100 items per transaction
+    print("Test 6: capacity raise promotes the first 120 of 130 waitlisted users")
+    api_db = main.db
+    put_event('e2', 1, 1, 130)
+    users = [f'w{i:03d}' for i in range(130)]
+    for user_id in users:
+        join(user_id, 'e2', api_db)
+    transactions = record_transactions(api_db)
+    adjustments = count_calls(api_db, 'adjust_event_counts')
+    response = TestClient(main.app).put('/events/e2', json={'capacity': 121}, headers={'X-Request-ID': 'raise-1'})
+    body = response.json()
+    check("promoted in join order", body['promotedUsers'] == users[:120])
+    check("one 100-item and one 20-item transaction", [size for size, _ in transactions] == [100, 20])
+    check("transactions run in the request's context", all(rid == 'raise-1' for _, rid in transactions))
+    check("counters adjusted once", len(adjustments) == 1)
+    stored = api_db.get_event('e2')
+    check("event counts 121 registered, 10 waitlisted", (stored.registeredCount, stored.waitlistCount) == (121, 10))
+    check("w120 is now first of 10", api_db.get_waitlist_rank(api_db.get_registration('w120', 'e2')) == (1, 10))
+    check("w000 is registered in place", api_db.get_registration('w000', 'e2').status == 'registered')
+    print()
+
+    # Test 7: legacy tables delete the entry and put a new registration
+    print("Test 7: legacy promotion actions and sizing")
+    os.environ['REGISTRATIONS_KEY_SCHEMA'] = 'legacy'
+    os.environ['REGISTRATIONS_TABLE_NAME'] = 'LegacyRegistrations'
+    legacy_db = DynamoDBClient()
+    os.environ['REGISTRATIONS_KEY_SCHEMA'] = 'composite'
+    os.environ['REGISTRATIONS_TABLE_NAME'] = 'Registrations'
+
+    entry = Registration(registrationId='old', userId='u', eventId='e', status='waitlisted', registeredAt='x')
+    promoted_registration = entry.model_copy(update={'registrationId': 'new', 'status': 'registered'})
+    composite_actions = db._promotion_actions(entry, promoted_registration)
+    check("composite: one Put conditioned on the waitlisted entry",
+          [list(a) for a in composite_actions] == [['Put']]
+          and composite_actions[0]['Put']['ConditionExpression'] == 'registrationId = :rid AND #status = :waitlisted'
+          and composite_actions[0]['Put']['ExpressionAttributeValues'][':rid'] == 'old')
+    legacy_actions = legacy_db._promotion_actions(entry, promoted_registration)
+    check("legacy: Delete of the waitlisted entry, then a new Put",
+          [list(a) for a in legacy_actions] == [['Delete'], ['Put']]
+          and legacy_actions[0]['Delete']['Key'] == {'registrationId': 'old'}
+          and legacy_actions[0]['Delete']['ConditionExpression'] == '#status = :waitlisted'
+          and legacy_actions[1]['Put']['Item']['registrationId'] == 'new'
+          and legacy_actions[1]['Put']['ConditionExpression'] == 'attribute_not_exists(registrationId)')
+
+    put_event('e3', 1, 1, 120)
+    for user_id in users[:120]:
+        join(user_id, 'e3', legacy_db)
+    transactions = record_transactions(legacy_db)
+    promoted = legacy_db.promote_waitlisted(legacy_db.get_event('e3'), 120)
+    check("promoted in join order", promoted == users[:120])
+    check("50 users (100 items) per transaction", [size for size, _ in transactions] == [100, 100, 40])
+    check("no waitlist entries left", legacy_db.get_waitlist_users('e3') == [])
+    check("every user holds one registration",
+          len(legacy_db.get_event_registrations('e3', 'registered')) == 120)
+    print()
+
+    # Test 8: an entry that left after the waitlist was read
+    print("Test 8: a stale entry makes its chunk fall back to single promotions")
+    put_event('e4', 1, 1, 5)
+    for user_id in users[:5]:
+        join(user_id, 'e4')
+    waitlist = db.get_waitlist_users('e4')
+    db.delete_registration(waitlist[1])
+    db.get_waitlist_users = lambda event_id: waitlist
+    transactions = record_transactions(db)
+    adjustments = count_calls(db, 'adjust_event_counts')
+    promoted = db.promote_waitlisted(db.get_event('e4'), 5)
+    del db.get_waitlist_users
+    check("everyone else promoted in order", promoted == [users[0]] + users[2:5])
+    check("chunk retried one user at a time", [size for size, _ in transactions] == [5, 1, 1, 1, 1, 1])
+    check("counters adjusted once", adjustments == [('e4', {'registeredCount': 4, 'waitlistCount': -4})])
+    check("the departed user was not registered", db.get_registration(users[1], 'e4') is None)
+    print()
+
+if failures:
+    print(f"{failures} check(s) failed")
+    sys.exit(1)
+print("All waitlist tests passed!")